@@ -0,0 +1,44 @@
+# throughput of src.main on many small programs, in files per second:
+# one process for every file (the way main was run before), one process for all the files,
+# and one process with a pool of workers
+# run with: python3.12 -m benchmarks.batch_main [files] [jobs]
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from benchmarks.batch_stress import programs
+
+# only this many files are run with one process for every file, it takes too long for all of them
+SINGLE_RUNS = 50
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    command = [sys.executable, '-m', 'src.main']
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i, source in enumerate(programs(n)):
+            with open(os.path.join(directory, f'{i:06}.lisp'), 'w') as file:
+                file.write(source)
+        files = sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+        # the lexer is built once and saved in the cache before the timers start
+        subprocess.run(command + files[:1], capture_output=True)
+
+        runs = [('process per file', files[:SINGLE_RUNS], None),
+                ('one process', files, command + [directory]),
+                (f'--jobs {jobs}', files, command + ['--jobs', str(jobs), directory])]
+        print(f'{"mode":>18} {"files":>7} {"seconds":>9} {"files/s":>9}')
+        for name, measured, batch_command in runs:
+            start = perf_counter()
+            if batch_command is None:
+                for path in measured:
+                    subprocess.run(command + [path], capture_output=True)
+            else:
+                subprocess.run(batch_command, capture_output=True)
+            elapsed = perf_counter() - start
+            print(f'{name:>18} {len(measured):>7} {elapsed:>9.2f} {len(measured) / elapsed:>9.0f}')
+
+if __name__ == '__main__':
+    main()
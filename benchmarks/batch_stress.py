@@ -0,0 +1,60 @@
+# stress test of BatchInterpreter: thousands of programs run at the same time on a thread pool
+# have to give the same outputs (or raise the same errors) as when they run one after the other
+# run with: python3.12 -m benchmarks.batch_stress [programs] [threads]
+import random
+import sys
+from time import perf_counter
+from src.Lexer import Lexer
+from src.BatchInterpreter import BatchInterpreter
+from src.main import Spec
+
+TEMPLATES = [
+    '(+ {a} {b} {c})',
+    '(++ (({a} {b}) (+ {c} {a}) ()))',
+    '(lambda x: (+ x x) (+ {a} {b}))',
+    '({a} {b} ({c} {a}) ())',
+    '(lambda x: (x x) ({a} {b}))',
+    '((lambda x: lambda y: x) {a} {b})',
+    '(\n\t(+ {a} {b})\n\t({c} {a})\n\tabc\n)',
+    '(((lambda x: lambda y: lambda z: ((x z) y) lambda x: lambda y: x) {a}) {b})',
+    '((lambda x: lambda y: (y x) {a}) {b})',
+    '(lambda x: (+ x) ({a} {b} {c}))',
+    '({a} {b} # {c})',
+]
+
+def programs(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [rng.choice(TEMPLATES).format(a=rng.randint(0, 999), b=rng.randint(0, 999), c=rng.randint(0, 999))
+            for _ in range(n)]
+
+def outcome(run, source: str) -> tuple[str, str]:
+    # the output of a program or its error, so the programs after a failed one still run
+    try:
+        return 'output', run(source)
+    except Exception as error:
+        return type(error).__name__, str(error)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    sources = programs(n)
+
+    with BatchInterpreter(Lexer(Spec.spec), threads) as batch:
+        start = perf_counter()
+        expected = [outcome(batch.run, source) for source in sources]
+        serial = perf_counter() - start
+
+        # run_all stops at the first error, the pool of the batch runs the programs here
+        start = perf_counter()
+        outputs = list(batch.pool.map(lambda source: outcome(batch.run, source), sources))
+        concurrent = perf_counter() - start
+
+    mismatches = sum(output != want for output, want in zip(outputs, expected))
+    errors = sum(kind != 'output' for kind, _ in expected)
+    print(f'programs: {n}, threads: {threads}, errors: {errors}, mismatches: {mismatches}')
+    print(f'serial: {serial:.2f} s, thread pool: {concurrent:.2f} s')
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# time of one evaluation of a parsed program, walking the tree and calling the compiled closures
+# every program is evaluated many times, x is given a different value every time
+# the best of REPEATS rounds is kept
+# run with: python3.12 -m benchmarks.compiled
+from time import perf_counter
+from src.Lexer import Lexer
+from src.Interpreter import Parser, Environment
+from src.main import Spec
+
+RUNS = 2_000
+REPEATS = 5
+
+PROGRAMS = {
+    'plus': '(+ 1 2 x (3 4) (+ x 5 6) 7 8 9 10)',
+    'concat': '(++ ((1 2) x (3 4) (5 6 x) 7 8 9 10))',
+    'lists': '(1 (2 x) (3 (4 x) ()) (+ x 1) (5 6 7 8))',
+    'lambda': '(lambda a: (+ a a) (x 2 3))',
+    'curried': '(((lambda f: lambda g: lambda v: ((f v) (g v)) lambda p: lambda q: (+ p q)) lambda r: (+ r x)) 1)',
+}
+
+def main():
+    lexer = Lexer(Spec.spec)
+    print(f'{"program":>8} {"tree us":>9} {"compiled us":>12} {"speedup":>8} {"compile us":>11}')
+    for name, source in PROGRAMS.items():
+        expr = Parser(lexer.lex(source)).parse()
+        inputs = [Environment({'x': i}) for i in range(RUNS)]
+
+        tree = float('inf')
+        for _ in range(REPEATS):
+            start = perf_counter()
+            expected = [expr.evaluate(env) for env in inputs]
+            tree = min(tree, (perf_counter() - start) / RUNS)
+
+        start = perf_counter()
+        program = expr.compile()
+        compile_time = perf_counter() - start
+
+        compiled = float('inf')
+        for _ in range(REPEATS):
+            start = perf_counter()
+            results = [program(env) for env in inputs]
+            compiled = min(compiled, (perf_counter() - start) / RUNS)
+
+        assert results == expected
+        print(f'{name:>8} {tree * 1e6:>9.2f} {compiled * 1e6:>12.2f} {tree / compiled:>8.2f} {compile_time * 1e6:>11.1f}')
+
+if __name__ == '__main__':
+    main()
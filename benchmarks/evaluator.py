@@ -0,0 +1,43 @@
+# time the evaluation of large programs, the program is lexed and parsed before the timer starts
+# run with: python3.12 -m benchmarks.evaluator
+import contextlib
+import io
+from time import perf_counter
+from src.Lexer import Lexer
+from src.Interpreter import Interpreter, Parser
+from src.main import Spec
+
+SIZES = [1_000, 10_000, 100_000]
+
+def numbers(n: int) -> str:
+    return ' '.join(str(i % 100) for i in range(n))
+
+def pairs(n: int) -> str:
+    return ' '.join(f'({i % 100} {i % 7})' for i in range(n // 2))
+
+PROGRAMS = {
+    'plus': lambda n: f'(+ {numbers(n)})',
+    'plus lists': lambda n: f'(+ {pairs(n)})',
+    'concat': lambda n: f'(++ ({pairs(n)}))',
+    'lambda plus': lambda n: f'(lambda x: (+ x x) ({numbers(n)}))',
+    'lambda list': lambda n: f'(lambda x: (x x) ({numbers(n)}))',
+}
+
+def main():
+    lexer = Lexer(Spec.spec)
+    print(f'{"program":>12} {"size":>8} {"seconds":>9}')
+    for name, program in PROGRAMS.items():
+        for size in SIZES:
+            expr = Parser(lexer.lex(program(size))).parse()
+            output = io.StringIO()
+            start = perf_counter()
+            try:
+                with contextlib.redirect_stdout(output):
+                    Interpreter(expr).evaluate()
+                elapsed = f'{perf_counter() - start:>9.3f}'
+            except (RecursionError, MemoryError, SyntaxError, ValueError) as error:
+                elapsed = f'{type(error).__name__:>9}'
+            print(f'{name:>12} {size:>8} {elapsed}')
+
+if __name__ == '__main__':
+    main()
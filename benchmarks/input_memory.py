@@ -0,0 +1,62 @@
+# peak memory of lexing a file: read whole and lexed into a list of tokens,
+# or read in chunks while the tokens are consumed one by one (the way src.main does it)
+# every way of reading runs in its own process, so the peak of one does not hide the other
+# run with: python3.12 -m benchmarks.input_memory [size in MB]
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from collections import deque
+from time import perf_counter
+from src.Lexer import Lexer
+from src.main import Spec
+from benchmarks.lex_scaling import program
+
+MODES = ['read', 'chunks']
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run(mode: str, path: str) -> None:
+    lexer = Lexer(Spec.spec)
+    before = peak_rss_mb()
+    start = perf_counter()
+    with open(path, 'r') as file:
+        if mode == 'read':
+            tokens = len(lexer.lex(file.read()))
+        else:
+            counter = deque(enumerate(lexer.iter_tokens(file), 1), maxlen=1)
+            tokens = counter[0][0] if counter else 0
+    elapsed = perf_counter() - start
+    print(tokens, elapsed, before, peak_rss_mb())
+
+def main():
+    size = int(float(sys.argv[1]) * 1_000_000) if len(sys.argv) > 1 else 20_000_000
+
+    # the file is written a block at a time, the processes started later inherit the peak of this one
+    block = program(1_000_000)
+    with tempfile.NamedTemporaryFile('w', suffix='.lisp', delete=False) as file:
+        path = file.name
+        for _ in range(max(size // len(block), 1)):
+            file.write(block)
+        size = file.tell()
+
+    try:
+        print(f'input: {size / 1e6:.0f} MB')
+        print(f'{"mode":>8} {"tokens":>10} {"seconds":>9} {"start MB":>9} {"peak MB":>9} {"added MB":>9}')
+        for mode in MODES:
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.input_memory', '--run', mode, path],
+                                    capture_output=True, text=True, check=True).stdout
+            tokens, elapsed, before, peak = output.split()
+            added = float(peak) - float(before)
+            print(f'{mode:>8} {tokens:>10} {float(elapsed):>9.2f} {float(before):>9.1f} {float(peak):>9.1f} {added:>9.1f}')
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--run':
+        run(sys.argv[2], sys.argv[3])
+    else:
+        main()
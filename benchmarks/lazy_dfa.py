@@ -0,0 +1,25 @@
+# compare the eager and the lazy dfa on a spec with hundreds of tokens
+# run with: python3.12 -m benchmarks.lazy_dfa
+from time import perf_counter
+from src.Lexer import Lexer
+from benchmarks.subset_construction import keyword_spec
+
+def main():
+    spec = keyword_spec(400)
+    word = 'akw bkw hello 123 zzkw world 42 ' * 5_000
+
+    print(f'{"engine":>16} {"build s":>9} {"lex s":>9} {"hits":>9} {"misses":>7} {"evictions":>9} {"nfa steps":>9}')
+    for name, options in [('eager', {}), ('lazy', {'lazy': True}), ('lazy, 16 states', {'lazy': True, 'cache_size': 16})]:
+        start = perf_counter()
+        lexer = Lexer(spec, **options)
+        built = perf_counter()
+        lexer.lex(word)
+        lexed = perf_counter()
+
+        engine = lexer.engine
+        counters = [getattr(engine, counter, '-') for counter in ('hits', 'misses', 'evictions', 'nfa_steps')]
+        print(f'{name:>16} {built - start:>9.3f} {lexed - built:>9.3f} '
+              f'{counters[0]:>9} {counters[1]:>7} {counters[2]:>9} {counters[3]:>9}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+# regression benchmark for the lexer: the time per character should stay the same
+# from 10 KB to 10 MB, lexing has to be linear in the size of the input
+# run with: python3.12 -m benchmarks.lex_scaling
+from time import perf_counter
+from src.Lexer import Lexer
+from src.main import Spec
+
+LINE = '(lambda x: (+ x 1 (2 3)) 5)\n\t(++ ((1 2) (3 4) abc))\n'
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+def program(size: int) -> str:
+    # repeat the same lines until the program has 'size' characters
+    return (LINE * (size // len(LINE) + 1))[:size - size % len(LINE)]
+
+def main():
+    lexer = Lexer(Spec.spec)
+    print(f'{"size":>10} {"tokens":>10} {"seconds":>10} {"us/char":>10}')
+    for size in SIZES:
+        word = program(size)
+        start = perf_counter()
+        tokens = lexer.lex(word)
+        elapsed = perf_counter() - start
+        print(f'{len(word):>10} {len(tokens):>10} {elapsed:>10.3f} {elapsed / len(word) * 1e6:>10.3f}')
+
+if __name__ == '__main__':
+    main()
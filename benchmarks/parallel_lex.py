@@ -0,0 +1,38 @@
+# lex the same large program on 1 to 8 processes, the tokens have to be the same as the ones of lex
+# the time includes sending the pieces to the workers and merging the tokens, not starting the workers
+# run with: python3.12 -m benchmarks.parallel_lex [size in MB]
+import os
+import sys
+from time import perf_counter
+from src.Lexer import Lexer
+from src.ParallelLexer import ParallelLexer
+from src.main import Spec
+from benchmarks.lex_scaling import program
+
+WORKERS = [1, 2, 4, 8]
+
+def main():
+    size = int(float(sys.argv[1]) * 1_000_000) if len(sys.argv) > 1 else 10_000_000
+    lexer = Lexer(Spec.spec)
+    word = program(size)
+
+    start = perf_counter()
+    expected = lexer.lex(word)
+    serial = perf_counter() - start
+
+    print(f'cores: {os.cpu_count()}, input: {len(word) / 1e6:.0f} MB, tokens: {len(expected)}')
+    print(f'{"workers":>8} {"seconds":>9} {"speedup":>8}')
+    print(f'{"lex":>8} {serial:>9.2f} {1:>8.2f}')
+    for workers in WORKERS:
+        with ParallelLexer(lexer, workers) as parallel:
+            # the first call starts the workers
+            parallel.lex(word[:parallel.min_chunk * workers])
+            start = perf_counter()
+            tokens = parallel.lex(word)
+            elapsed = perf_counter() - start
+        assert tokens == expected and tokens.offsets == expected.offsets
+        assert tokens.lines == expected.lines and tokens.cols == expected.cols
+        print(f'{workers:>8} {elapsed:>9.2f} {serial / elapsed:>8.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# stress inputs for the parser: 10^5 levels of nesting and 10^6 tokens, none of them may hit the recursion limit
+# the programs are only lexed and parsed, the time of the parser is printed
+# run with: python3.12 -m benchmarks.parser_stress
+from time import perf_counter
+from src.Lexer import Lexer
+from src.Interpreter import Parser
+from src.main import Spec
+
+DEPTH = 100_000
+TOKENS = 1_000_000
+
+INPUTS = {
+    'nested lists': '(' * DEPTH + '1' + ')' * DEPTH,
+    'nested plus': '(+ 1 ' * DEPTH + ')' * DEPTH,
+    'nested concat': '(++ (' * DEPTH + '1' + '))' * DEPTH,
+    'nested lambdas': '(lambda x: ' * DEPTH + 'x' + ' 1)' * DEPTH,
+    'newlines': '\n' * TOKENS + '(1 2)',
+    'long list': '(' + '1\n\t' * (TOKENS // 3) + ')',
+}
+
+def depth(expr) -> int:
+    # how deep the tree is, without recursion
+    deepest = 0
+    stack = [(expr, 1)]
+    while stack:
+        expr, level = stack.pop()
+        deepest = max(deepest, level)
+        for child in getattr(expr, 'elements', None) or []:
+            stack.append((child, level + 1))
+        if hasattr(expr, 'body'):
+            stack.append((expr.body, level + 1))
+            stack.extend((value, level + 1) for value in expr.values)
+    return deepest
+
+def main():
+    lexer = Lexer(Spec.spec)
+    print(f'{"input":>15} {"tokens":>9} {"depth":>8} {"parse s":>8}')
+    for name, source in INPUTS.items():
+        tokens = lexer.tokenize(source)
+        start = perf_counter()
+        expr = Parser(tokens).parse()
+        elapsed = perf_counter() - start
+        print(f'{name:>15} {len(tokens):>9} {depth(expr):>8} {elapsed:>8.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# generators of synthetic programs for the benchmarks, every one of them gets a size n
+# and builds a program that grows linearly with it
+from string import ascii_lowercase
+
+def name(i: int) -> str:
+    # the i-th identifier: a, b, ..., z, ba, bb, ... (ids can only have letters)
+    letters = ascii_lowercase[i % 26]
+    while i >= 26:
+        i //= 26
+        letters = ascii_lowercase[i % 26] + letters
+    return letters
+
+def flat_list(n: int) -> str:
+    # (0 1 2 ... n-1)
+    return '(' + ' '.join(map(str, range(n))) + ')'
+
+def deep_nesting(n: int) -> str:
+    # ((((1)))) with n levels of parentheses
+    return '(' * n + '1' + ')' * n
+
+def wide_sum(n: int) -> str:
+    # (+ 0 1 2 ... n-1)
+    return '(+ ' + ' '.join(map(str, range(n))) + ')'
+
+def concat(n: int, width: int = 100) -> str:
+    # (++ ((...) (...) ...)) with n numbers in lists of width numbers
+    lists = (' '.join(map(str, range(start, min(start + width, n)))) for start in range(0, n, width))
+    return '(++ (' + ' '.join(f'({numbers})' for numbers in lists) + '))'
+
+def curried(n: int) -> str:
+    # (((lambda a: lambda b: lambda c: (+ a b c) 1) 2) 3), a lambda of n arguments applied one by one
+    ids = [name(i) for i in range(n)]
+    lambdas = ' '.join(f'lambda {id}:' for id in ids)
+    arguments = ''.join(f' {i})' for i in range(2, n + 1))
+    return '(' * (n - 1) + f'({lambdas} (+ {" ".join(ids)}) 1)' + arguments
+
+GENERATORS = {
+    'flat list': flat_list,
+    'deep nesting': deep_nesting,
+    'wide sum': wide_sum,
+    'concat': concat,
+    'curried lambdas': curried,
+}
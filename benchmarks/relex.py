@@ -0,0 +1,31 @@
+# benchmark for incremental lexing: a one character edit in a 1 MB program,
+# lexed again from the start and with Lexer.relex
+# run with: python3.12 -m benchmarks.relex
+from time import perf_counter
+from src.Lexer import Lexer
+from src.main import Spec
+from benchmarks.lex_scaling import program
+
+def main():
+    lexer = Lexer(Spec.spec)
+    word = program(1_000_000)
+    tokens = lexer.lex(word)
+
+    # replace a digit in the middle of the program with another digit
+    offset = word.index('5', len(word) // 2)
+    new_word = word[:offset] + '7' + word[offset + 1:]
+
+    start = perf_counter()
+    full = lexer.lex(new_word)
+    full_time = perf_counter() - start
+
+    start = perf_counter()
+    spliced, (first, old_stop, new_stop) = lexer.relex(tokens, new_word, offset, 1, '7')
+    relex_time = perf_counter() - start
+
+    assert spliced == full
+    print(f'tokens: {len(full)}, relexed tokens: {new_stop - first} (replacing {old_stop - first})')
+    print(f'full lex: {full_time:.3f} s, relex: {relex_time:.4f} s, speedup: {full_time / relex_time:.0f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# load generator for src.Server: starts a server on a unix socket and sends it programs from many
+# connections at the same time, every connection waits for its response before the next request
+# prints the p50 and p99 latency and the requests per second
+# run with: python3.12 -m benchmarks.server_load [requests] [connections] [socket path]
+# with a socket path the server that already listens there is used and no server is started
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from benchmarks.batch_stress import programs
+
+async def client(path: str, sources: list[str], latencies: list[float]) -> int:
+    # sends the sources one by one, returns how many of them got an error
+    # (one of the templates of batch_stress has a character the lexer doesn't know)
+    reader, writer = await asyncio.open_unix_connection(path, limit=1 << 24)
+    errors = 0
+    for i, source in enumerate(sources):
+        start = perf_counter()
+        writer.write(json.dumps({'id': i, 'source': source}).encode() + b'\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(perf_counter() - start)
+        errors += 'error' in response
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+async def load(path: str, n: int, connections: int) -> None:
+    sources = programs(n)
+    latencies = []
+    start = perf_counter()
+    errors = await asyncio.gather(*(client(path, sources[i::connections], latencies) for i in range(connections)))
+    elapsed = perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)]
+    print(f'requests: {n}, connections: {connections}, errors: {sum(errors)}')
+    print(f'p50: {p50 * 1000:.2f} ms, p99: {p99 * 1000:.2f} ms, {n / elapsed:.0f} requests/s')
+
+async def wait_for_socket(path: str, server: subprocess.Popen) -> None:
+    while not os.path.exists(path):
+        if server.poll() is not None:
+            sys.exit('the server stopped before it listened on the socket')
+        await asyncio.sleep(0.05)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    if len(sys.argv) > 3:
+        asyncio.run(load(sys.argv[3], n, connections))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'server.sock')
+        server = subprocess.Popen([sys.executable, '-m', 'src.Server', '--socket', path])
+        try:
+            asyncio.run(wait_for_socket(path, server))
+            asyncio.run(load(path, n, connections))
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# the spaces between tokens as a skipped token of the spec instead of padding around every regex
+# compares the dfa of the spec in main with the one of the same spec where every token matches the spaces
+# around it, and times Lexer.tokenize on sources with more and more spaces: with the padded spec,
+# with the skipped spaces run by the dfa and with the skipped spaces scanned by a regex before the dfa
+# run with: python3.12 -m benchmarks.skip_tokens
+from time import perf_counter
+from src.Lexer import Lexer, SKIP
+from src.TokenStore import PADDING
+from src.main import Spec
+
+SIZE = 100_000
+SPACES = [1, 8, 32]
+
+# the spec in main before the spaces were skipped
+PADDED_SPEC = [(token, f'\\ *{regex}\\ *') for token, regex, *skip in Spec.spec if skip != [SKIP]]
+
+def spaced(n: int, spaces: int) -> str:
+    # (0 1 2 ... n-1) with 'spaces' spaces between the numbers
+    return '(' + (' ' * spaces).join(map(str, range(n))) + ')'
+
+def indented(n: int, spaces: int) -> str:
+    # the numbers of (0 1 ... n-1) on their own lines, indented by 'spaces' spaces
+    return '(\n' + ''.join(f'{" " * spaces}{i}\n' for i in range(n)) + ')'
+
+def best(function, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    return min(times)
+
+def main():
+    padded = Lexer(PADDED_SPEC)
+    skipping = Lexer(Spec.spec)
+    # the same lexer without the scan of the spaces before the dfa
+    dfa_only = Lexer(Spec.spec)
+    dfa_only.skip_chars, dfa_only.skip_run = frozenset(), None
+
+    print(f'{"spec":>8} {"states":>7} {"minimized":>10} {"transitions":>12}')
+    for name, lexer in (('padded', padded), ('skipped', skipping)):
+        print(f'{name:>8} {lexer.nr_states_before:>7} {lexer.nr_states_after:>10} {lexer.compiled.nr_transitions():>12}')
+
+    print()
+    print(f'{"input":>10} {"spaces":>7} {"chars":>9} {"padded":>9} {"dfa skip":>9} {"fast skip":>10} {"speedup":>8}')
+    for name, generator in (('spaced', spaced), ('indented', indented)):
+        for spaces in SPACES:
+            word = generator(SIZE, spaces)
+            assert len(padded.tokenize(word, padding=PADDING)) == len(skipping.tokenize(word))
+            padded_time = best(lambda: padded.tokenize(word, padding=PADDING))
+            dfa_time = best(lambda: dfa_only.tokenize(word))
+            fast_time = best(lambda: skipping.tokenize(word))
+            print(f'{name:>10} {spaces:>7} {len(word):>9} {padded_time:>8.3f}s {dfa_time:>8.3f}s {fast_time:>9.3f}s '
+                  f'{padded_time / fast_time:>7.2f}x')
+
+if __name__ == '__main__':
+    main()
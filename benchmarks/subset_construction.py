@@ -0,0 +1,45 @@
+# benchmark for the subset construction on specs with hundreds of tokens
+# run with: python3.12 -m benchmarks.subset_construction
+from time import perf_counter
+from src.NFA import NFA, NFABuilder, EPSILON
+from src.Regex import parse_regex
+
+SIZES = [50, 100, 200, 400]
+
+def keyword_spec(n: int) -> list[tuple[str, str]]:
+    # n keywords made of letters, followed by identifiers and numbers
+    keywords = []
+    for i in range(n):
+        word = ''
+        while True:
+            word += 'abcdefghijklmnopqrstuvwxyz'[i % 26]
+            i //= 26
+            if i == 0:
+                break
+        keywords.append((f'KW_{word}', f'{word}kw'))
+    return keywords + [('ID', '([a-z]|[A-Z])+'), ('NR', '[0-9]+'), ('SPACE', '\\ +')]
+
+def merged_nfa(spec: list[tuple[str, str]]) -> NFA:
+    # the nfas of all the tokens, reachable on EPSILON from a new initial state
+    builder = NFABuilder()
+    initial_state = builder.new_state()
+    final_states = set()
+    for token, regex in spec:
+        start, end = parse_regex(regex).build(builder)
+        final_state = builder.new_state(token)
+        builder.add_transition(end, EPSILON, final_state)
+        builder.add_transition(initial_state, EPSILON, start)
+        final_states.add(final_state)
+    return builder.nfa(initial_state, final_states)
+
+def main():
+    print(f'{"tokens":>8} {"nfa states":>12} {"dfa states":>12} {"seconds":>10}')
+    for n in SIZES:
+        nfa = merged_nfa(keyword_spec(n))
+        start = perf_counter()
+        dfa = nfa.subset_construction()
+        elapsed = perf_counter() - start
+        print(f'{n + 3:>8} {len(nfa.K):>12} {len(dfa.K):>12} {elapsed:>10.3f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# end to end benchmark: times every stage on its own, Lexer.__init__, Lexer.tokenize (the lex stage), Parser.parse
+# and Interpreter.evaluate, for the programs of benchmarks.programs at growing sizes
+# the results are written as json, so the curves of two commits can be compared
+# a stage that fails (like a RecursionError) is saved as the error of that size, the next sizes still run
+# run with: python3.12 -m benchmarks.suite [--output results.json] [--repeat N] [--only NAME ...]
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import perf_counter
+import io
+import json
+import platform
+import subprocess
+import sys
+from src.Lexer import Lexer
+from src.Interpreter import Interpreter, Parser
+from src.main import Spec
+from benchmarks.programs import GENERATORS
+
+SIZES = [1_000, 10_000, 100_000]
+
+# the sizes of the programs that are slower to run or that go deeper
+GENERATOR_SIZES = {
+    'deep nesting': [10, 100, 1_000, 10_000],
+    'curried lambdas': [100, 1_000, 3_000],
+}
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def timed(function, repeat: int):
+    # the result of the function and its fastest time
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = function()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def evaluate(expr) -> str:
+    # evaluate prints the result, it is kept in memory so the terminal isn't timed
+    output = io.StringIO()
+    with redirect_stdout(output):
+        Interpreter(expr).evaluate()
+    return output.getvalue()
+
+def measure(lexer: Lexer, name: str, size: int, repeat: int) -> dict:
+    source = GENERATORS[name](size)
+    result = {'program': name, 'size': size, 'chars': len(source)}
+    try:
+        tokens, result['lex'] = timed(lambda: lexer.tokenize(source), repeat)
+        result['tokens'] = len(tokens)
+        expr, result['parse'] = timed(lambda: Parser(tokens).parse(), repeat)
+        _, result['evaluate'] = timed(lambda: evaluate(expr), repeat)
+    except Exception as error:
+        result['error'] = f'{type(error).__name__}: {error}'
+    return result
+
+def main():
+    arguments = ArgumentParser(prog='python3.12 -m benchmarks.suite', description='Time every stage of the interpreter.')
+    arguments.add_argument('--output', '-o', help='json file for the results, stdout without it')
+    arguments.add_argument('--repeat', '-r', type=int, default=1, help='runs of every stage, the fastest one is kept')
+    arguments.add_argument('--only', nargs='+', choices=list(GENERATORS), help='programs to run')
+    options = arguments.parse_args()
+
+    _, lexer_init = timed(lambda: Lexer(Spec.spec), options.repeat)
+    lexer = Lexer(Spec.spec)
+
+    results = []
+    for name in options.only or GENERATORS:
+        for size in GENERATOR_SIZES.get(name, SIZES):
+            result = measure(lexer, name, size, options.repeat)
+            results.append(result)
+            stages = ' '.join(f'{stage} {result[stage]:.4f}s' for stage in ('lex', 'parse', 'evaluate') if stage in result)
+            print(f'{name:>15} {size:>7} {stages} {result.get("error", "")}', file=sys.stderr)
+
+    report = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'lexer_init': lexer_init,
+        'results': results,
+    }
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# memory kept for every token and every node of the tree, measured with tracemalloc
+# the tokens of Lexer.lex are a tuple and a string for every token, the ones of Lexer.tokenize
+# are a kind and two offsets in the arrays of a TokenStore
+# run with: python3.12 -m benchmarks.token_memory
+import gc
+import tracemalloc
+from src.Lexer import Lexer
+from src.Interpreter import Parser, count_nodes
+from src.main import Spec
+from benchmarks.programs import GENERATORS
+
+INPUTS = [('flat list', 100_000), ('wide sum', 100_000), ('concat', 100_000), ('curried lambdas', 3_000)]
+
+def kept(function):
+    # the result of the function and the memory it still holds after it returns
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, memory
+
+def main():
+    lexer = Lexer(Spec.spec)
+    print(f'{"input":>15} {"tokens":>8} {"lex B/tok":>10} {"store B/tok":>12} {"nodes":>8} {"B/node":>8}')
+    for name, size in INPUTS:
+        word = GENERATORS[name](size)
+        tokens, lex_memory = kept(lambda: lexer.lex(word))
+        store, store_memory = kept(lambda: lexer.tokenize(word))
+        expr, tree_memory = kept(lambda: Parser(store).parse())
+        nodes = count_nodes(expr)
+        print(f'{name:>15} {len(store):>8} {lex_memory / len(tokens):>10.1f} {store_memory / len(store):>12.1f} '
+              f'{nodes:>8} {tree_memory / nodes:>8.1f}')
+
+if __name__ == '__main__':
+    main()
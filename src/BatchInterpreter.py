@@ -0,0 +1,35 @@
+from src.Lexer import Lexer
+from src.Interpreter import Interpreter, Parser
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterable, Iterator
+
+
+class BatchInterpreter:
+    # run many programs on a pool of threads, all of them lexed by the same lexer
+    # the lexer only reads its dfa while lexing, every program gets its own parser and environment,
+    # so nothing is shared between the programs that run at the same time
+    # (a lazy lexer fills its cache from more threads, which only costs some repeated work)
+    def __init__(self, lexer: Lexer, workers: int | None = None) -> None:
+        self.lexer = lexer
+        self.pool = ThreadPoolExecutor(workers)
+
+    def __enter__(self) -> 'BatchInterpreter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+    def run(self, source: str) -> str:
+        # the output of one program, an error of the lexer is raised like the ones of the parser and the interpreter
+        tokens = self.lexer.tokenize(source)
+        if tokens.error is not None:
+            raise ValueError(tokens.error)
+        return Interpreter(Parser(tokens).parse()).run()
+
+    def run_all(self, sources: Iterable[str]) -> Iterator[str]:
+        # the outputs of the programs, in the order of the sources
+        # an exception raised by a program is raised again when its output is reached
+        return self.pool.map(self.run, sources)
@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from bisect import bisect_right
+
+# the largest code point of a character
+MAX_CODE_POINT = 0x10FFFF
+
+
+@dataclass(frozen=True)
+class CharClass:
+    # a set of characters, kept as sorted, disjoint ranges of code points (both ends included)
+    # it labels a single transition of an nfa, so [a-z] or [^0-9] don't need one transition
+    # for every character
+    ranges: tuple[tuple[int, int], ...]
+
+    @staticmethod
+    def from_ranges(ranges: list[tuple[int, int]]) -> 'CharClass':
+        # sort the ranges and merge the ones that touch
+        merged = []
+        for low, high in sorted(ranges):
+            if merged and low <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+            else:
+                merged.append((low, high))
+        return CharClass(tuple(merged))
+
+    def negate(self) -> 'CharClass':
+        # all the characters that are not in the class
+        ranges = []
+        low = 0
+        for start, end in self.ranges:
+            if start > low:
+                ranges.append((low, start - 1))
+            low = end + 1
+        if low <= MAX_CODE_POINT:
+            ranges.append((low, MAX_CODE_POINT))
+        return CharClass(tuple(ranges))
+
+    def __contains__(self, character: str) -> bool:
+        code = ord(character)
+        i = bisect_right(self.ranges, (code, MAX_CODE_POINT)) - 1
+        return i >= 0 and self.ranges[i][0] <= code <= self.ranges[i][1]
+
+    def __repr__(self) -> str:
+        parts = []
+        for low, high in self.ranges:
+            parts.append(chr(low) if low == high else f'{chr(low)}-{chr(high)}')
+        return f"[{''.join(parts)}]"
+
+
+# the classes of the escapes \d, \w and \s
+DIGITS = CharClass.from_ranges([(ord('0'), ord('9'))])
+WORD = CharClass.from_ranges([(ord('0'), ord('9')), (ord('a'), ord('z')), (ord('A'), ord('Z')), (ord('_'), ord('_'))])
+SPACES = CharClass.from_ranges([(ord(c), ord(c)) for c in ' \t\n\r\f\v'])
+ESCAPED_CLASSES = {
+    'd': DIGITS,
+    'w': WORD,
+    's': SPACES,
+    'D': DIGITS.negate(),
+    'W': WORD.negate(),
+    'S': SPACES.negate(),
+}
+
+# . is any character but the newline
+ANY = CharClass.from_ranges([(ord('\n'), ord('\n'))]).negate()
+
+
+def split_alphabet(labels: set) -> tuple[list, dict]:
+    # split the characters used by the labels of an nfa (single characters and classes)
+    # into disjoint symbols, so that every label is a union of symbols
+    # a symbol is a single character, or a CharClass with a single range
+    # returns the symbols and, for every label, the symbols it is made of
+    classes = [label for label in labels if isinstance(label, CharClass)]
+    if not classes:
+        return list(labels), {label: [label] for label in labels}
+
+    # the points where a symbol can start
+    cuts = set()
+    for label in labels:
+        if isinstance(label, CharClass):
+            for low, high in label.ranges:
+                cuts.add(low)
+                cuts.add(high + 1)
+        else:
+            cuts.add(ord(label))
+            cuts.add(ord(label) + 1)
+    cuts = sorted(cuts)
+
+    def symbol(low: int, high: int) -> str | CharClass:
+        return chr(low) if low == high else CharClass(((low, high),))
+
+    symbols_of = {}
+    used = {}
+    for label in labels:
+        ranges = label.ranges if isinstance(label, CharClass) else ((ord(label), ord(label)),)
+        parts = []
+        for low, high in ranges:
+            # the cuts inside the range split it into symbols
+            i = bisect_right(cuts, low) - 1
+            while i + 1 < len(cuts) and cuts[i] <= high:
+                part = symbol(cuts[i], min(cuts[i + 1], high + 1) - 1)
+                parts.append(part)
+                used[part] = None
+                i += 1
+        symbols_of[label] = parts
+
+    return list(used), symbols_of
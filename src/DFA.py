@@ -1,15 +1,162 @@
-from collections.abc import Callable
+from collections.abc import Callable, Hashable
 from dataclasses import dataclass
+from collections import deque
+from array import array
+from bisect import bisect_right
+from .CharClass import CharClass
+
+# characters below this code point that are in a range symbol get their class in class_of,
+# the others are looked up in the ranges
+DIRECT_CLASS_LIMIT = 256
+
+
+@dataclass
+class CompiledDFA:
+    # a dfa with the states renumbered to 0..n_states-1 and the characters grouped
+    # into classes of characters that behave the same in every state
+    # tokens has the label of every final state (for the lexer, the token it accepts), -1 for the others
+    # the next state of 'state' on a character of class 'cls' is table[state * n_classes + cls]
+    # -1 in the table means the transition is not defined
+    # characters that are not in class_of are looked up in ranges, sorted (low, high, class) triples
+    tokens: array
+    q0: int
+    n_classes: int
+    class_of: dict[str, int]
+    table: array
+    accept: list[bool]
+    sink: list[bool]
+    ranges: list[tuple[int, int, int]]
+
+    def __post_init__(self) -> None:
+        self.range_starts = [low for low, _, _ in self.ranges]
+
+    def wide_class(self, character: str) -> int:
+        # the class of a character that is not in class_of, -1 if it is in no range
+        code = ord(character)
+        i = bisect_right(self.range_starts, code) - 1
+        if i >= 0 and code <= self.ranges[i][1]:
+            return self.ranges[i][2]
+        return -1
+
+    def step(self, state: int, character: str) -> int:
+        # get the next state on a character, -1 if there is none
+        cls = self.class_of.get(character, -1)
+        if cls < 0:
+            cls = self.wide_class(character)
+            if cls < 0:
+                return -1
+        return self.table[state * self.n_classes + cls]
+
+    def token(self, state: int) -> int:
+        # the token accepted in a final state
+        return self.tokens[state]
+
+    def nr_transitions(self) -> int:
+        # the defined transitions, between states and classes of characters
+        return len(self.table) - self.table.count(-1)
+
+    def lookahead(self) -> int | None:
+        # the most characters the dfa can read after its last final state before it stops:
+        # the states that are neither final nor sinks it can go through, and the character it stops on
+        # None if there is no limit (a loop of such states can be reached from a final state)
+        n_states = len(self.accept)
+        middle = [not self.accept[i] and not self.sink[i] for i in range(n_states)]
+
+        def next_states(state: int) -> set[int]:
+            row = self.table[state * self.n_classes:(state + 1) * self.n_classes]
+            return {next_state for next_state in row if next_state >= 0 and middle[next_state]}
+
+        # the longest path of middle states starting from each middle state after a final state,
+        # found with a depth first search, a state seen again on the stack is a loop
+        roots = {j for i in range(n_states) if self.accept[i] for j in next_states(i)}
+        longest: dict[int, int] = {}
+        on_stack = set()
+        for root in roots:
+            if root in longest:
+                continue
+            stack = [(root, iter(next_states(root)))]
+            on_stack.add(root)
+            while stack:
+                state, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    on_stack.discard(state)
+                    longest[state] = 1 + max((longest[j] for j in next_states(state)), default=0)
+                elif child in on_stack:
+                    return None
+                elif child not in longest:
+                    on_stack.add(child)
+                    stack.append((child, iter(next_states(child))))
+
+        return 1 + max((longest[j] for j in roots), default=0)
+
+    def dump(self) -> tuple:
+        # the fields of the compiled dfa as builtin values, so they can be saved with marshal
+        return (self.tokens.tobytes(), self.q0, self.n_classes, self.class_of,
+                self.table.typecode, self.table.tobytes(), bytes(self.accept), bytes(self.sink), self.ranges)
+
+    @staticmethod
+    def load(data: tuple) -> 'CompiledDFA':
+        # build the compiled dfa back from the values returned by dump
+        tokens_bytes, q0, n_classes, class_of, typecode, table_bytes, accept, sink, ranges = data
+        table = array(typecode)
+        table.frombytes(table_bytes)
+        tokens = array('i')
+        tokens.frombytes(tokens_bytes)
+        return CompiledDFA(tokens, q0, n_classes, dict(class_of), table,
+                           [bool(x) for x in accept], [bool(x) for x in sink], [tuple(r) for r in ranges])
+
+    def longest_match(self, word: str, start: int, end: int) -> tuple[int, int, int, int]:
+        # run the dfa on word[start:end] until it gets stuck or the word ends
+        # returns (end of the longest match or -1, the state it was accepted in,
+        #          the position where the dfa stopped, the state it stopped in)
+        # the dfa stops in the state -1 if the character is not in the alphabet,
+        # in a sink state if no longer match is possible, and at 'end' if the word ended first
+        class_of = self.class_of
+        table = self.table
+        n_classes = self.n_classes
+        accept = self.accept
+        sink = self.sink
+
+        state = self.q0
+        last_end = -1
+        last_state = -1
+        for i in range(start, end):
+            cls = class_of.get(word[i], -1)
+            if cls < 0:
+                cls = self.wide_class(word[i])
+                if cls < 0:
+                    return last_end, last_state, i, -1
+            state = table[state * n_classes + cls]
+            if state < 0:
+                return last_end, last_state, i, -1
+            if accept[state]:
+                last_end = i + 1
+                last_state = state
+            elif sink[state]:
+                return last_end, last_state, i, state
+        return last_end, last_state, end, state
 
 
 @dataclass
 class DFA[STATE]:
-    S: set[str]
+    # the alphabet is made of characters and of CharClass ranges that don't overlap
+    S: set[str | CharClass]
     K: set[STATE]
     q0: STATE
-    d: dict[tuple[STATE, str], STATE]
+    d: dict[tuple[STATE, str | CharClass], STATE]
     F: set[STATE]
 
+    def symbol_of(self, character: str) -> str | CharClass | None:
+        # the symbol of the alphabet a character belongs to
+        if character in self.S:
+            return character
+        for symbol in self.S:
+            if isinstance(symbol, CharClass) and character in symbol:
+                return symbol
+        return None
+
     def helper_accept(self, word: str, current_state: STATE) -> bool:
         # if the word is empty
         if word == '':
@@ -18,7 +165,7 @@ class DFA[STATE]:
             # because the DFA has a sink state == frozenset() in case the transition
             # function of the NFA was not defined on a state and character, then the next_state
             # will never get to be None
-            next_state = self.d.get((current_state, word[0]), None)
+            next_state = self.d.get((current_state, self.symbol_of(word[0])), None)
             return self.helper_accept(word[1:], next_state)
 
 
@@ -48,3 +195,149 @@ class DFA[STATE]:
         #                   \-a,b-/
 
         pass
+
+    def minimize(self, label: Callable[[STATE], Hashable] | None = None) -> 'DFA[STATE]':
+        # minimize the dfa using Hopcroft's partition refinement algorithm
+        # label gives the identity of a final state (for the lexer, the token it accepts),
+        # final states with different labels are never merged
+        # each block of equivalent states is represented in the new dfa by one of its states,
+        # so the states keep their type (and the information stored in them)
+
+        # only the states reachable from the initial state are kept
+        reachable = {self.q0}
+        queue = deque([self.q0])
+        while queue:
+            state = queue.popleft()
+            for character in self.S:
+                next_state = self.d.get((state, character), None)
+                if next_state is not None and next_state not in reachable:
+                    reachable.add(next_state)
+                    queue.append(next_state)
+
+        # a missing transition goes to an implicit sink, so Hopcroft works on a complete dfa
+        implicit_sink = object()
+        states = list(reachable)
+        inverse: dict[tuple[object, str], list[object]] = {}
+        for state in states:
+            for character in self.S:
+                next_state = self.d.get((state, character), implicit_sink)
+                inverse.setdefault((next_state, character), []).append(state)
+        if any(key[0] is implicit_sink for key in inverse):
+            states.append(implicit_sink)
+            for character in self.S:
+                inverse.setdefault((implicit_sink, character), []).append(implicit_sink)
+
+        # the initial partition separates non final states from final states,
+        # and the final states by their label
+        initial_blocks: dict[Hashable, set] = {}
+        for state in states:
+            if state is not implicit_sink and state in self.F:
+                key = (True, label(state) if label is not None else None)
+            else:
+                key = (False, None)
+            initial_blocks.setdefault(key, set()).add(state)
+
+        blocks = list(initial_blocks.values())
+        block_of = {state: i for i, block in enumerate(blocks) for state in block}
+
+        # every block but the largest one has to be used as a splitter
+        largest = max(range(len(blocks)), key=lambda i: len(blocks[i]))
+        worklist = {i for i in range(len(blocks)) if i != largest}
+
+        while worklist:
+            splitter = blocks[worklist.pop()]
+            for character in self.S:
+                # the states that go into the splitter on 'character'
+                predecessors = [state for target in splitter for state in inverse.get((target, character), ())]
+                if not predecessors:
+                    continue
+
+                # group the predecessors by the block they are in
+                touched: dict[int, set] = {}
+                for state in predecessors:
+                    touched.setdefault(block_of[state], set()).add(state)
+
+                for i, inside in touched.items():
+                    block = blocks[i]
+                    if len(inside) == len(block):
+                        continue
+                    # split the block into the states that go into the splitter and the ones that don't
+                    outside = block - inside
+                    blocks[i] = inside
+                    blocks.append(outside)
+                    new_i = len(blocks) - 1
+                    for state in outside:
+                        block_of[state] = new_i
+
+                    if i in worklist:
+                        worklist.add(new_i)
+                    else:
+                        # it is enough to refine by the smaller half
+                        worklist.add(i if len(inside) <= len(outside) else new_i)
+
+        # pick a representative for each block, the initial state represents its own block
+        representative = {}
+        for block in blocks:
+            real_states = [state for state in block if state is not implicit_sink]
+            if not real_states:
+                continue
+            chosen = self.q0 if self.q0 in block else real_states[0]
+            for state in block:
+                representative[state] = chosen
+
+        new_K = set(representative.values())
+        new_F = {state for state in new_K if state in self.F}
+        new_d = dict()
+        for state in new_K:
+            for character in self.S:
+                next_state = self.d.get((state, character), None)
+                if next_state is not None and next_state in representative:
+                    new_d[(state, character)] = representative[next_state]
+
+        return DFA(self.S, new_K, self.q0, new_d, new_F)
+
+    def compile(self, label: Callable[[STATE], int] | None = None) -> CompiledDFA:
+        # turn the dfa into a flat transition table that can be indexed with ints
+        # label gives the int saved for every final state, it is computed only once here
+        # (for the lexer, the token accepted in the state), by default it is 0
+
+        # number the states, the initial state gets the number 0
+        states = [self.q0] + [state for state in self.K if state != self.q0]
+        number = {state: i for i, state in enumerate(states)}
+
+        # two symbols are in the same class if they go to the same state from every state
+        classes: dict[tuple[int, ...], int] = {}
+        class_of = {}
+        ranges = []
+        for symbol in sorted(self.S, key=lambda x: x.ranges[0] if isinstance(x, CharClass) else (ord(x), ord(x))):
+            column = tuple(number.get(self.d.get((state, symbol), None), -1) for state in states)
+            cls = classes.setdefault(column, len(classes))
+            if isinstance(symbol, CharClass):
+                low, high = symbol.ranges[0]
+                ranges.append((low, high, cls))
+                for code in range(low, min(high + 1, DIRECT_CLASS_LIMIT)):
+                    class_of[chr(code)] = cls
+            else:
+                class_of[symbol] = cls
+
+        n_classes = len(classes)
+        table = array('i', [-1]) * (len(states) * n_classes)
+        for column, cls in classes.items():
+            for i, next_state in enumerate(column):
+                table[i * n_classes + cls] = next_state
+
+        accept = [state in self.F for state in states]
+        tokens = array('i', [(label(state) if label is not None else 0) if state in self.F else -1 for state in states])
+
+        # a state is a sink if no final state can be reached from it
+        alive = set(i for i in range(len(states)) if accept[i])
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(states)):
+                if i not in alive and any(table[i * n_classes + cls] in alive for cls in range(n_classes)):
+                    alive.add(i)
+                    changed = True
+        sink = [i not in alive for i in range(len(states))]
+
+        return CompiledDFA(tokens, 0, n_classes, class_of, table, accept, sink, ranges)
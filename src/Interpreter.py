@@ -1,413 +1,618 @@
 from dataclasses import dataclass
-import ast
-from collections import deque
-
-# number of parantheses open for a lambda expression
-par_cnt = 0
-# if we are still parsing a lambda expression
-is_lambda = False
-# nr of values that will replace the ids in a lambda expression
-cnt = 0
-# dictionary that will contain the ids and their corresponding values
-dict_id_val = {}
-
-@dataclass
+from array import array
+from collections.abc import Callable, Generator, Iterable
+from types import GeneratorType
+from src.Stats import Stats
+from src.TokenKind import TokenKind
+from src.TokenStore import TokenStore
+from src.TokenStream import TokenStream
+
+# the values of the language: numbers, symbols (ids that have no value), lists and functions
+type Value = int | str | list[Value] | Closure
+
+# an expression compiled to a python function of the environment it is evaluated in
+type Compiled = Callable[[Environment], Value]
+
+
+class Environment:
+    # a frame with the values of the ids bound by a lambda
+    # the ids that are not in it are looked up in the frames around it
+    def __init__(self, values: dict[str, Value] | None = None, parent: 'Environment | None' = None) -> None:
+        self.values = values if values is not None else {}
+        self.parent = parent
+
+    # the frames of lambda bodies have a parent, the frame of the program doesn't
+    def in_lambda(self) -> bool:
+        return self.parent is not None
+
+    def lookup(self, id: str) -> Value:
+        env = self
+        while env is not None:
+            values = env.values
+            if id in values:
+                return values[id]
+            env = env.parent
+        # an id without a value is a symbol, it stands for itself
+        return id
+
+
+class CountingEnvironment(Environment):
+    # an environment that counts the frames made in it: the closures apply their ids in a frame
+    # of the same class as the one they were made in, so every function application of a run is counted
+    def __init__(self, values: dict[str, Value] | None = None, parent: 'CountingEnvironment | None' = None,
+                 steps: list[int] | None = None) -> None:
+        super().__init__(values, parent)
+        self.steps = steps if steps is not None else parent.steps
+        self.steps[0] += 1
+
+
+@dataclass(slots=True)
+class Closure:
+    # a lambda together with the environment it was created in
+    # a lambda with more ids is curried, it takes one value at a time
+    # the body is the function that evaluates it, Expr.evaluate or the compiled body
+    ids: list[str]
+    body: Compiled
+    env: Environment
+
+    def apply(self, value: Value) -> Value:
+        env = self.env.__class__({self.ids[0]: value}, self.env)
+        if len(self.ids) > 1:
+            return Closure(self.ids[1:], self.body, env)
+        return self.body(env)
+
+
+def apply(function: Value, values: Iterable[Value]) -> Value:
+    # apply a function to the values, one at a time
+    for value in values:
+        if not isinstance(function, Closure):
+            raise Exception(f'{format_value(function)} is not a function!')
+        function = function.apply(value)
+    return function
+
+
+def add_numbers(value: Value) -> int:
+    # the sum of the numbers in a value and in the lists inside it
+    total = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if type(value) is int:
+            total += value
+        elif isinstance(value, list):
+            stack.extend(value)
+        else:
+            raise Exception(f'{format_value(value)} is not a number!')
+    return total
+
+
+def format_value(value: Value) -> str:
+    # the output of a value, lists are written as ( a b c ) and the empty list as ()
+    parts = []
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, list):
+            if not value:
+                parts.append('()')
+            else:
+                parts.append('(')
+                stack.append(')')
+                stack.extend(reversed(value))
+        elif isinstance(value, Closure):
+            parts.append(''.join(f'lambda {id}: ' for id in value.ids) + '...')
+        else:
+            parts.append(str(value))
+    return ' '.join(parts)
+
+
+def count_nodes(expr: 'Expr') -> int:
+    # the nodes of a tree, the ids of a lambda are nodes too
+    count = 0
+    stack = [expr]
+    while stack:
+        expr = stack.pop()
+        count += 1
+        if isinstance(expr, Lambda):
+            stack.extend(expr.id)
+            stack.append(expr.body)
+            stack.extend(expr.values)
+        elif not isinstance(expr, (Id, Number)):
+            stack.extend(expr.elements)
+    return count
+
+
+@dataclass(slots=True)
 class Expr:
-    def evaluate(self) -> str:
+    # an expression is evaluated by walking the tree with evaluate, or compiled once to nested
+    # python closures with compile, which can then be called for many environments
+    # the decisions that depend only on the tree are taken by compile, the closures only evaluate
+    def evaluate(self, env: Environment) -> Value:
+        raise NotImplementedError('Subclasses should implement this!')
+
+    # scope has the ids bound by the lambdas around the expression, the innermost last,
+    # every id is in its own frame, so the frame of an id is found once, here
+    def compile(self, scope: tuple[str, ...] = ()) -> Compiled:
         raise NotImplementedError('Subclasses should implement this!')
 
-@dataclass
+@dataclass(slots=True)
 class Id(Expr):
     value: str
 
-    def evaluate(self) -> str:
-        return self.value
-    
-    def replace_by_value(self, value: str) -> str:
-        self.value = value
-        return self.value
-
-@dataclass	
+    def evaluate(self, env: Environment) -> Value:
+        return env.lookup(self.value)
+
+    def compile(self, scope: tuple[str, ...] = ()) -> Compiled:
+        id = self.value
+        if id in scope:
+            depth = scope[::-1].index(id)
+            if depth == 0:
+                return lambda env: env.values[id]
+            if depth == 1:
+                return lambda env: env.parent.values[id]
+
+            def lookup(env: Environment) -> Value:
+                for _ in range(depth):
+                    env = env.parent
+                return env.values[id]
+            return lookup
+
+        # an id that no lambda binds is looked up in the environment the program is evaluated in
+        depth = len(scope)
+
+        def lookup_free(env: Environment) -> Value:
+            for _ in range(depth):
+                env = env.parent
+            return env.lookup(id)
+        return lookup_free
+
+@dataclass(slots=True)
 class Lambda(Expr):
     id: list[Expr]
     body: Expr
     values: list[Expr] or []
 
-    def evaluate(self) -> str:
-        # evaluate ids
-        ids = []
-        for id in self.id:
-            ids.append(id.evaluate())
-        
+    def evaluate(self, env: Environment) -> Value:
+        function = Closure([id.value for id in self.id], self.body.evaluate, env)
+
         # if the values list is empty, the lambda is a value for another lambda
         if self.values == []:
-            res = self.body.evaluate()
-            str_output = ''
-            for id in ids:
-                str_output += f'lambda {id}: '
-            new_res = ''
-            if '(' in res:
-                for i in range(len(res)):
-                    if res[i].isalnum():
-                        new_res += '(' + res[i] + ')'
-                    if i < len(res) - 2 and res[i].isalnum() and res[i + 2] != ')':
-                        new_res += ','
-                res = new_res
-            else:
-                new_res += '(' + res[0] + ')'
-                res = new_res
-            str_output += res
-            return str_output
-        
-        values = []
-        for value in self.values:
-            values.append(value.evaluate())
-        
-        global dict_id_val
-        dict_id_val = dict(zip(ids, values))
-
-        # evaluate body
-        res = self.body.evaluate()
-
-        # number of values that will replace the ids
-        global cnt
-        cnt = len(values)
-
-        # boolean variable to check if the values are of lambda type
-        is_lambda = any('lambda' in value for value in values)
-
-        # if the body contains a list we have to put commas between elements
-        if '(' in res:
-            new_res = ''
-            for i in range(len(res)):
-                if res[i] in '()':
-                    new_res += res[i]
-                if res[i].isalnum():
-                    new_res += '(' + res[i] + ')'
-                if is_lambda == False and i < len(res) - 2 and res[i].isalnum() and res[i + 2] != ')':
-                    new_res += ','
-            res = new_res
-        
-        for i in range(len(values)):
-            # if the value contains a list we have to put commas between elements
-            # if the value contains lambdas we don't put commas between elements
-            if '(' in values[i] and 'lambda' not in values[i]:
-                new_value = ''
-                for j in range(len(values[i])):
-                    new_value += values[i][j]
-                    if j < len(values[i]) - 2 and values[i][j].isalnum() and values[i][j + 2] != ')':
-                        new_value += ','
-                values[i] = new_value
-
-        # recreate the lambda expression so that it has the right syntax for 
-        # ast module from python to evaluate it
-        lambda_expr = ''
-        # for each id in ids we put a lambda before it and : after it
-        lambda_expr += '('
-        for id in ids:
-            lambda_expr += f'lambda {id}: '
-        
-        # add the body
-        lambda_expr += res
-        lambda_expr += ')'
-        # add each value in its own parantheses
-        for value in values:
-            lambda_expr += f'({value})'
-
-        # evaluate the lambda expression
-        tree = ast.parse(lambda_expr, mode='eval')
-        result = eval_lambda(tree.body)
-
-        # make output into string
-        str_result = str(result)
-        # make output into the right format
-        str_result = str_result.replace(',', '').replace('(', '( ').replace(')', ' )')
-        return str_result
-
-@dataclass
+            return function
+
+        # the values are given to the ids in order
+        return apply(function, [value.evaluate(env) for value in self.values])
+
+    def compile(self, scope: tuple[str, ...] = ()) -> Compiled:
+        ids = [id.value for id in self.id]
+        body = self.body.compile(scope + tuple(ids))
+        if self.values == []:
+            return lambda env: Closure(ids, body, env)
+
+        values = [value.compile(scope) for value in self.values]
+        if len(values) == 1:
+            value = values[0]
+            return lambda env: Closure(ids, body, env).apply(value(env))
+        return lambda env: apply(Closure(ids, body, env), [value(env) for value in values])
+
+@dataclass(slots=True)
 class Plus(Expr):
     elements: list[Expr]
 
-    def evaluate(self) -> int:
-        result = []
+    def evaluate(self, env: Environment) -> Value:
         # the plus operation will add every number element in its elements list of numbers and lists
+        total = 0
         for element in self.elements:
-            result.append(element.evaluate())
-        
-        result = ' '.join(result)
-
-        # for each id in dict_id_val replace it with the corresponding value
-        global dict_id_val
-        for id in dict_id_val:
-            result = result.replace(id, dict_id_val[id])
-        
-        # we add all the numbers in result
-        result = result.replace('(', '').replace(')', '')
-        list_result = [int(s) for s in result.split()]
-        sum_result = sum(list_result)
-        return str(sum_result)
+            value = element.evaluate(env)
+            total += value if type(value) is int else add_numbers(value)
+        return total
+
+    def compile(self, scope: tuple[str, ...] = ()) -> Compiled:
+        # the numbers are added once, here
+        constant = sum(element.value for element in self.elements if isinstance(element, Number))
+        elements = [element.compile(scope) for element in self.elements if not isinstance(element, Number)]
+        if not elements:
+            return lambda env: constant
+
+        def plus(env: Environment) -> Value:
+            total = constant
+            for element in elements:
+                value = element(env)
+                total += value if type(value) is int else add_numbers(value)
+            return total
+        return plus
     
-@dataclass
+@dataclass(slots=True)
 class Concat(Expr):
     # you can concatenate a number with a list
     # you can concatenate a list with a list
+    # a ++ without parantheses is spliced: its elements are put in the list around it, or in the output
     elements: list[Expr]
+    spliced: bool = False
 
-    def evaluate(self) -> str:
-        # concatenate the elements in the list
+    def evaluate(self, env: Environment) -> Value:
+        # the elements of the lists are put in the result, the other values are put as they are
         result = []
-        
         for element in self.elements:
-            if isinstance(element, Number):
-                result.append(element.evaluate())
-            elif isinstance(element, List):
-                if len(element.elements) != 0:
-                    result.append(element.get_list_elements())
-            elif isinstance(element, Plus):
-                result.append(element.evaluate())
-            elif isinstance(element, Id):
-                result.append(element.evaluate())
-            elif isinstance(element, Lambda):
-                res = element.evaluate()
-                result.append(res)
+            value = element.evaluate(env)
+            if isinstance(value, list):
+                result.extend(value)
             else:
-                raise Exception('Invalid token!')
-        return ' '.join(result)
-
-@dataclass
+                result.append(value)
+        return result
+
+    def compile(self, scope: tuple[str, ...] = ()) -> Compiled:
+        elements = [element.compile(scope) for element in self.elements]
+
+        def concat(env: Environment) -> Value:
+            result = []
+            for element in elements:
+                value = element(env)
+                if isinstance(value, list):
+                    result.extend(value)
+                else:
+                    result.append(value)
+            return result
+        return concat
+
+@dataclass(slots=True)
 class List(Expr):
     elements: list[Expr]
 
-    def evaluate(self) -> str:
-        result = []
-
-        # if elements is just an empty list
-        if len(self.elements) == 0:
-            result.append('()')
-            return ' '.join(result)
-        
-        # create a list of the elements in string format
-        result.append('(')
-        
-        for element in self.elements:
-            result.append(element.evaluate())
-
-        global cnt	
-        if cnt > 0:
-            cnt -= 1
-            # eliminate first (
-            result.pop(0)
-        else:
-            result.append(')')
-        
-        return ' '.join(result)
-    
-    # for concat operation
-    def get_list_elements(self) -> str | None:
-        result = []
-        if len(self.elements) == 0:
-            return ''
-        for element in self.elements:
-            result.append(element.evaluate())
-        return ' '.join(result)
-
-@dataclass
+    def evaluate(self, env: Environment) -> Value:
+        values = [element.evaluate(env) for element in self.elements]
+
+        # in the body of a lambda the parantheses are the ones of the lambda calculus:
+        # a single element is only grouped, and a function is applied to the elements after it
+        if env.in_lambda() and values:
+            if len(values) == 1:
+                return values[0]
+            if isinstance(values[0], Closure):
+                return apply(values[0], values[1:])
+        return values
+
+    def compile(self, scope: tuple[str, ...] = ()) -> Compiled:
+        # a list of numbers is built once, the values are never changed after they are made
+        if all(isinstance(element, Number) for element in self.elements):
+            values = [element.value for element in self.elements]
+            value = values[0] if scope and len(values) == 1 else values
+            return lambda env: value
+
+        elements = [element.compile(scope) for element in self.elements]
+        # in the body of a lambda the parantheses group and apply, like in evaluate
+        if not scope:
+            return lambda env: [element(env) for element in elements]
+        if len(elements) == 1:
+            return elements[0]
+
+        def application(env: Environment) -> Value:
+            values = [element(env) for element in elements]
+            if isinstance(values[0], Closure):
+                return apply(values[0], values[1:])
+            return values
+        return application
+
+@dataclass(slots=True)
 class Number(Expr):
-    value: str
+    value: int
 
-    def evaluate(self) -> str:
+    def evaluate(self, env: Environment) -> Value:
         return self.value
 
-# evaluate lambda using the ast module from python
-def eval_lambda(node):
-    if isinstance(node, ast.Lambda):
-        func = eval(compile(ast.Expression(node), filename='<ast>', mode='eval'))
-        return func
-    elif isinstance(node, ast.Constant):
-        return node.value
-    elif isinstance(node, ast.Call):
-        func = eval_lambda(node.func)
-        args = [eval_lambda(arg) for arg in node.args]
-        return func(*args)
-    elif isinstance(node, ast.List):
-        return (eval_lambda(elt) for elt in node.elts)
-    elif isinstance(node, ast.Tuple):
-        return tuple(eval_lambda(elt) for elt in node.elts) 
-    else:
-        raise Exception(f'Unknown node {node}')
+    def compile(self, scope: tuple[str, ...] = ()) -> Compiled:
+        value = self.value
+        return lambda env: value
 
 class Interpreter:
-    def __init__(self, result_list: Expr) -> None:
+    def __init__(self, result_list: Expr, stats: Stats | None = None) -> None:
         self.result_list = result_list
         self.output = []
+        self.stats = stats
     
     def evaluate(self) -> None:
-        print(self.result_list.evaluate())
-        
-        # '(lambda x: lambda y: lambda z: (((x) (z)) (y))) (lambda x: lambda y: (x)) (1) (2)'
-        # '(lambda x: lambda y: (((x) (y))(x)))(lambda x: lambda y: (x))(lambda x: lambda y: (y))(1)(2)'
-        # '(lambda x: ((x), (x))) ((1, 2))'
-        # '(lambda x: lambda y: ((y), (x))) ((1, 2, 3)) ((4, 5, 6))'
-        # '(lambda x: lambda y: lambda z: (x)) (1) (2) (3)'
-        # '(lambda x: lambda x: (x)) (1) (2)'
+        print(self.run())
+
+    def run(self) -> str:
+        # the program is evaluated to a value, which is formatted only at the end
+        # every evaluation has its own environment, so programs can be evaluated at the same time
+        if self.stats is None:
+            return self.format(self.result_list.evaluate(Environment()))
+
+        # the steps of the evaluation are the function applications, the frame of the program is not one
+        steps = [-1]
+        output = self.format(self.result_list.evaluate(CountingEnvironment(steps=steps)))
+        self.stats.count('steps', steps[0])
+        return output
+
+    def format(self, value: Value) -> str:
+        # a program that is a spliced ++ outputs its elements without the parantheses around them
+        if type(self.result_list) is Concat and self.result_list.spliced:
+            return ' '.join(map(format_value, value))
+        return format_value(value)
+
+
+# the kinds the parser compares, as plain ints
+LAMBDA, OPAR, CPAR, NR, ID, PLUS, CONCAT, NEWLINE, SEPARATOR, TAB = (int(kind) for kind in TokenKind)
+KIND_NAMES = [kind.name for kind in TokenKind]
+# the kinds that only separate expressions
+SEPARATING = frozenset((CPAR, NEWLINE, TAB))
+# the values of the digits, a character of a string is not a new string
+DIGITS = {str(digit): digit for digit in range(10)}
 
 
 class Parser:
-    def __init__(self, token_list: list[tuple[str, str]]) -> None:
-        # turn the list into a deque for easier parsing
-        self.token_list = deque(token_list)
+    def __init__(self,
+                 token_list: TokenStore | Iterable[tuple[str, str]],
+                 stats: Stats | None = None) -> None:
+        # the tokens are read from a TokenStore, a list of (TOKEN_NAME, MATCHED_STRING) tokens is put in a store first
+        # any other iterable of tokens (like the ones of Lexer.iter_tokens) is pulled lazily, one token at a time
+        # the error of the lexer (in the store or as the token with an empty name) is raised as a ValueError
+
+        # the index of the next token, the tokens before it were popped
+        # like popping from an empty list, looking at a token after the last one raises an IndexError
+        self.pos = 0
+
+        # the state of the parser is kept in the parser, so programs can be parsed at the same time
+        # number of parantheses open for a lambda expression
+        self.par_cnt = 0
+        # if we are still parsing a lambda expression
+        self.is_lambda = False
+        self.stats = stats
+
+        if isinstance(token_list, (list, tuple)):
+            token_list = TokenStore.from_tokens(token_list, KIND_NAMES)
+        elif not isinstance(token_list, TokenStore):
+            # the kinds and the texts are read from the stream, which tells if there is a token at a position
+            self.tokens = self.kinds = TokenStream(token_list)
+            self.has = self.tokens.has
+            self.parse_num = self.parse_streamed_num
+            self.parse_id = self.parse_streamed_id
+            return
+        if token_list.error is not None:
+            raise ValueError(token_list.error)
+        self.tokens = token_list
+        self.source = token_list.source
+        self.starts = token_list.starts
+        self.ends = token_list.ends
+
+        # the parser looks at the kinds of TokenKind, a store with other names has its kinds translated
+        # (the names after the ones of TokenKind are skipped tokens, they are never in a store)
+        if token_list.names[:len(KIND_NAMES)] == KIND_NAMES:
+            self.kinds = token_list.kinds
+        else:
+            kind_of = [TokenKind[name] for name in token_list.names]
+            self.kinds = array('b', [kind_of[kind] for kind in token_list.kinds])
+        # if there is a token at a position: it is before the last token
+        self.has = len(self.kinds).__gt__
+
+    def pop(self) -> None:
+        if not self.has(self.pos):
+            raise IndexError('pop from an empty list of tokens')
+        self.pos += 1
 
     def parse_num(self) -> Expr:
-        # pop NR
-        nr = self.token_list.popleft()[1]
-        # eliminate spaces from nr
-        nr = nr.replace(' ', '')
-        return Number(nr)
+        # pop NR, a number of one digit is read from the source without slicing it
+        # numbers and ids are the only tokens whose text is sliced from the source
+        pos = self.pos
+        self.pos = pos + 1
+        start = self.starts[pos]
+        end = self.ends[pos]
+        if end - start == 1:
+            return Number(DIGITS[self.source[start]])
+        return Number(int(self.source[start:end]))
+
+    def parse_streamed_num(self) -> Expr:
+        # pop NR, for tokens read from a stream
+        pos = self.pos
+        text = self.tokens.text(pos)
+        self.pos = pos + 1
+        return Number(DIGITS[text] if len(text) == 1 else int(text))
         
     def parse(self) -> Expr:
-        global par_cnt
-        global is_lambda
-        if len(self.token_list) == 0:
-            return None
-        elif self.token_list[0][0] == 'NR':
-            if is_lambda == False:
-                par_cnt = 0
+        result = self.parse_program()
+        if self.stats is not None:
+            self.stats.count('ast nodes', count_nodes(result))
+        return result
+
+    def parse_program(self) -> Expr:
+        # parse_expr returns numbers and ids at once, the expressions made of other expressions
+        # are parsed by generators: when one needs a sub-expression that is also parsed by a generator,
+        # it yields that generator and gets the sub-expression back from send
+        # the generators that wait for a sub-expression are kept on a stack instead of the call stack,
+        # so the nesting of a program is limited only by memory
+        res = self.parse_expr()
+        if type(res) is not GeneratorType:
+            return res
+        stack = [res]
+        res = None
+        while True:
+            try:
+                res = stack[-1].send(res)
+            except StopIteration as done:
+                stack.pop()
+                if not stack:
+                    return done.value
+                res = done.value
+            else:
+                stack.append(res)
+                res = None
+
+    def parse_expr(self) -> Expr | Generator[Generator, Expr, Expr]:
+        # skip the tokens that only separate expressions, there is no expression after the last token
+        kinds = self.kinds
+        pos = self.pos
+        has = self.has
+        while True:
+            if not has(pos):
+                self.pos = pos
+                return None
+            kind = kinds[pos]
+            if kind not in SEPARATING:
+                break
+            pos += 1
+        self.pos = pos
+
+        if kind == NR:
+            if self.is_lambda == False:
+                self.par_cnt = 0
             return self.parse_num()
-        elif self.token_list[0][0] == 'OPAR' and self.token_list[1][0] == 'PLUS':
-            if is_lambda == False:
-                par_cnt = 0
+        elif kind == OPAR and kinds[pos + 1] == PLUS:
+            if self.is_lambda == False:
+                self.par_cnt = 0
             return self.parse_plus()
-        elif self.token_list[0][0] == 'OPAR':
-            if is_lambda == False:
-                par_cnt += 1
-            return self.parse_nested_expr()
-        elif self.token_list[0][0] == 'CONCAT':
-            if is_lambda == False:
-                par_cnt = 0
+        elif kind == OPAR and kinds[pos + 1] == CONCAT:
+            if self.is_lambda == False:
+                self.par_cnt = 0
             return self.parse_concat()
-        elif self.token_list[0][0] == 'PLUS':
-            if is_lambda == False:
-                par_cnt = 0
+        elif kind == OPAR:
+            if self.is_lambda == False:
+                self.par_cnt += 1
+            return self.parse_nested_expr()
+        elif kind == CONCAT:
+            if self.is_lambda == False:
+                self.par_cnt = 0
+            return self.parse_concat(spliced=True)
+        elif kind == PLUS:
+            if self.is_lambda == False:
+                self.par_cnt = 0
             return self.parse_plus()
-        elif self.token_list[0][0] == 'ID':
-            if is_lambda == False:
-                par_cnt = 0
+        elif kind == ID:
+            if self.is_lambda == False:
+                self.par_cnt = 0
             return self.parse_id()
-        elif self.token_list[0][0] == 'LAMBDA':
-            if (is_lambda == True):
+        elif kind == LAMBDA:
+            if (self.is_lambda == True):
                 return self.parse_lambda_values()
             else:
-                is_lambda = True
-                res = self.parse_lambda()
-                par_cnt = 0
-                is_lambda = False
-                return res
-        elif self.token_list[0][0] == 'CPAR':
-            # pop CPAR
-            self.token_list.popleft()
-            return self.parse()
-        elif self.token_list[0][0] == 'NEWLINE':
-            # pop NEWLINE
-            self.token_list.popleft()
-            return self.parse()
-        elif self.token_list[0][0] == 'TAB':
-            # pop TAB
-            self.token_list.popleft()
-            return self.parse()
+                self.is_lambda = True
+                return self.parse_lambda()
         else:
             raise Exception('Invalid token!')
         
     def parse_id(self) -> Expr:
-        # pop ID
-        id = self.token_list.popleft()[1]
-        # eliminate spaces from id
-        id = id.replace(' ', '')
-        return Id(id)
+        # pop ID, the store has it without the spaces around it
+        pos = self.pos
+        self.pos = pos + 1
+        return Id(self.source[self.starts[pos]:self.ends[pos]])
+
+    def parse_streamed_id(self) -> Expr:
+        # pop ID, for tokens read from a stream
+        pos = self.pos
+        self.pos = pos + 1
+        return Id(self.tokens.text(pos))
 
     # parse lambdas  
-    def parse_lambda(self) -> Expr:
-        global par_cnt
+    def parse_lambda(self) -> Generator[Generator, Expr, Expr]:
         ids = []
-        while self.token_list[0][0] == 'LAMBDA':
-            
+        while self.kinds[self.pos] == LAMBDA:
             # pop LAMBDA
-            self.token_list.popleft()
+            self.pos += 1
             # parse ID
             ids.append(self.parse_id())
             # pop SEPARATOR
-            self.token_list.popleft()
+            self.pop()
 
         # parse body
-        body = self.parse()
+        body = self.parse_expr()
+        if type(body) is GeneratorType:
+            body = yield body
 
         values = []
         # until we close all the parantheses that we opened since the first lambda
         # there will still be values to be given to the ids
-        while par_cnt != 0 and len(self.token_list) != 0:
-            values.append(self.parse())
-            par_cnt -= 1
-
+        while self.par_cnt != 0 and self.has(self.pos):
+            res = self.parse_expr()
+            if type(res) is GeneratorType:
+                res = yield res
+            # the parantheses around a value only group it, like the ones of a single element in the body:
+            # (5) and ((5)) are the value 5, (1 2) stays a list
+            while type(res) is List and len(res.elements) == 1:
+                res = res.elements[0]
+            values.append(res)
+            self.par_cnt -= 1
+
+        # the lambda and its values are parsed
+        self.par_cnt = 0
+        self.is_lambda = False
         return Lambda(ids, body, values)
     
     # parse the values that will be given to the ids, that are also lambdas
-    def parse_lambda_values(self) -> Expr:
+    def parse_lambda_values(self) -> Generator[Generator, Expr, Expr]:
         ids = []
-        while self.token_list[0][0] == 'LAMBDA':
+        while self.kinds[self.pos] == LAMBDA:
             # pop LAMBDA
-            self.token_list.popleft()
+            self.pos += 1
             # parse ID
             ids.append(self.parse_id())
             # pop SEPARATOR
-            self.token_list.popleft()
+            self.pop()
 
         # parse body of lambda
-        body = self.parse()
+        body = self.parse_expr()
+        if type(body) is GeneratorType:
+            body = yield body
 
         # the values will be an empty list
         return Lambda(ids, body, [])
 
     # parse lists
-    def parse_nested_expr(self) -> Expr:
+    def parse_nested_expr(self) -> Generator[Generator, Expr, Expr]:
         # pop OPAR
-        self.token_list.popleft()
+        self.pos += 1
         
         elem = []
-        while len(self.token_list) != 0 and self.token_list[0][0] != 'CPAR':
-            res = self.parse()
+        kinds = self.kinds
+        has = self.has
+        while has(self.pos) and kinds[self.pos] != CPAR:
+            res = self.parse_expr()
+            if type(res) is GeneratorType:
+                res = yield res
             if res != None:
                 elem.append(res)
 
         # pop CPAR
-        if len(self.token_list) != 0:
-            self.token_list.popleft()
+        if has(self.pos):
+            self.pos += 1
+
+        # the parantheses around a lambda that got values are the ones of the application
+        if len(elem) == 1 and isinstance(elem[0], Lambda) and elem[0].values != []:
+            return elem[0]
+        # the elements of a spliced ++ go in the list, the other elements are concatenated as one element lists
+        if any(type(res) is Concat and res.spliced for res in elem):
+            return Concat([res if type(res) is Concat and res.spliced else List([res]) for res in elem])
         return List(elem)
     
     # parse concatenation
-    def parse_concat(self) -> Expr:
-        # pop CONCAT
-        self.token_list.popleft()
-        # pop OPAR
-        self.token_list.popleft()
+    def parse_concat(self, spliced: bool = False) -> Generator[Generator, Expr, Expr]:
+        # pop OPAR, CONCAT and the OPAR of the elements (CONCAT and the token after it, for a ++ without paranthesis)
+        self.pos += 1 if spliced else 2
+        self.pop()
         # elements that will be concatenated
         elem = []
-        while self.token_list[0][0] != 'CPAR':
-            elem.append(self.parse())
-
-        # pop CPAR
-        self.token_list.popleft()
-        return Concat(elem)
+        while self.kinds[self.pos] != CPAR:
+            res = self.parse_expr()
+            if type(res) is GeneratorType:
+                res = yield res
+            elem.append(res)
+
+        # pop CPAR of the elements and CPAR
+        self.pos += 1
+        if not spliced:
+            self.pop()
+        return Concat(elem, spliced)
     
     # parse plus
-    def parse_plus(self) -> Expr:
-        # pop OPAR
-        self.token_list.popleft()
-        # pop PLUS
-        self.token_list.popleft()
+    def parse_plus(self) -> Generator[Generator, Expr, Expr]:
+        # pop OPAR and PLUS (or PLUS and the token after it, for a plus without paranthesis)
+        self.pos += 1
+        self.pop()
         # elements that will be added
         elem = []
-        while self.token_list[0][0] != 'CPAR':
-            elem.append(self.parse())
+        while self.kinds[self.pos] != CPAR:
+            res = self.parse_expr()
+            if type(res) is GeneratorType:
+                res = yield res
+            elem.append(res)
 
         # pop CPAR
-        self.token_list.popleft()
+        self.pos += 1
         return Plus(elem)
@@ -0,0 +1,140 @@
+from .NFA import NFA, BitsetNFA
+from collections.abc import Callable
+
+# how many dfa states are kept by default
+LAZY_CACHE_SIZE = 4096
+
+# if the cache fills up before the lexer went over this many characters for each
+# cached state, the cache thrashes and the nfa is simulated directly for a while
+MIN_CHARS_PER_STATE = 10
+
+
+class LazyDFA[STATE]:
+    # a dfa built from an nfa while it is used (like the dfa of RE2)
+    # a state of the dfa is a set of nfa states, kept as an int with one bit for each nfa state
+    # a state and its transitions are computed only when a character is first seen in that state,
+    # and are kept in a cache of at most cache_size states
+    # when the cache is full it is emptied, if that happens too often the nfa is simulated
+    # without caching anything
+    def __init__(self, nfa: NFA[STATE], label: Callable[[STATE], int], cache_size: int = LAZY_CACHE_SIZE) -> None:
+        self.nfa = BitsetNFA(nfa)
+        self.q0 = self.nfa.q0
+        self.final_mask = self.nfa.final_mask
+        self.cache_size = max(cache_size, 1)
+
+        # the label of every final nfa state (for the lexer, the token it accepts),
+        # a final dfa state accepts the lowest label among its final nfa states
+        self.final_label = {i: label(self.nfa.states[i]) for i in self.nfa.bits(self.final_mask)}
+
+        # the nfa states from which a final state can be reached,
+        # a set without any of them is a sink
+        self.live_mask = self.live_states()
+
+        # transitions of the cached states, state -> {character -> next state}
+        self.cache: dict[int, dict[str, int]] = {}
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+        self.nfa_steps = 0
+
+        # characters gone through since the cache was last emptied
+        self.chars_since_flush = 0
+        # while the cache thrashes, the nfa is simulated for this many characters
+        self.fallback_chars = 0
+
+    def live_states(self) -> int:
+        # go backwards from the final states over all the transitions
+        previous: dict[int, set[int]] = {}
+        for (state, _), next_states in self.nfa.nfa.d.items():
+            for next_state in next_states:
+                previous.setdefault(self.nfa.bit[next_state], set()).add(self.nfa.bit[state])
+
+        live = set(self.nfa.bits(self.final_mask))
+        stack = list(live)
+        while stack:
+            i = stack.pop()
+            for j in previous.get(i, ()):
+                if j not in live:
+                    live.add(j)
+                    stack.append(j)
+
+        mask = 0
+        for i in live:
+            mask |= 1 << i
+        return mask
+
+    def flush(self) -> None:
+        # empty the cache, the state being used is added back by the caller
+        self.evictions += len(self.cache)
+        self.flushes += 1
+
+        # the cache filled up too fast, simulate the nfa for a while instead
+        if self.chars_since_flush < MIN_CHARS_PER_STATE * self.cache_size:
+            self.fallback_chars = MIN_CHARS_PER_STATE * self.cache_size
+
+        self.cache = {}
+        self.chars_since_flush = 0
+
+    def transitions(self, state: int) -> dict[str, int]:
+        # the cached transitions of a state, the state is added to the cache if it is not there
+        transitions = self.cache.get(state)
+        if transitions is None:
+            if len(self.cache) >= self.cache_size:
+                self.flush()
+            transitions = self.cache[state] = {}
+        return transitions
+
+    def longest_match(self, word: str, start: int, end: int) -> tuple[int, int, int, int]:
+        # run the dfa on word[start:end] until it gets stuck or the word ends
+        # works like CompiledDFA.longest_match, the states are sets of nfa states
+        symbol_of = self.nfa.symbol_of
+        final_mask = self.final_mask
+        live_mask = self.live_mask
+        step = self.nfa.step
+
+        state = self.q0
+        transitions = self.transitions(state)
+        last_end = -1
+        last_state = -1
+        for i in range(start, end):
+            character = word[i]
+            if self.fallback_chars > 0:
+                # the cache thrashes, simulate the nfa
+                self.fallback_chars -= 1
+                self.nfa_steps += 1
+                symbol = symbol_of(character)
+                if symbol is None:
+                    return last_end, last_state, i, -1
+                state = step(state, symbol)
+                if self.fallback_chars == 0:
+                    transitions = self.transitions(state)
+            else:
+                next_state = transitions.get(character)
+                if next_state is None:
+                    self.misses += 1
+                    symbol = symbol_of(character)
+                    if symbol is None:
+                        return last_end, last_state, i, -1
+                    next_state = transitions[character] = step(state, symbol)
+                else:
+                    self.hits += 1
+                self.chars_since_flush += 1
+                state = next_state
+                transitions = self.cache.get(state)
+                if transitions is None:
+                    transitions = self.transitions(state)
+
+            if state & final_mask:
+                last_end = i + 1
+                last_state = state
+            elif not state & live_mask:
+                return last_end, last_state, i, state
+        return last_end, last_state, end, state
+
+    def token(self, state: int) -> int:
+        # the token accepted in a final state, the one with the lowest label
+        # of the final nfa states in it
+        return min(self.final_label[i] for i in self.nfa.bits(state & self.final_mask))
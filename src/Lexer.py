@@ -1,171 +1,525 @@
-from src.NFA import NFA
+from src.NFA import NFA, NFABuilder
 from src.Regex import parse_regex
+from src.DFA import CompiledDFA
+from src.LazyDFA import LazyDFA, LAZY_CACHE_SIZE
+from src.TokenList import TokenList
+from src.TokenStore import TokenStore
+from src.Stats import Stats
+from collections.abc import Callable, Iterator
+from typing import TextIO
+import hashlib
+import marshal
+import os
+import sys
+from itertools import accumulate
+from operator import itemgetter
+from array import array
+from bisect import bisect_left, bisect_right
+import re
 EPSILON = ''
 
+# the third element of a spec entry for a token that is matched but never returned, like the spaces between tokens
+SKIP = 'skip'
+
+# how many characters are read at once from a file
+CHUNK_SIZE = 1 << 16
+
+# version of the compiled lexer saved in the cache, it has to change
+# every time the saved values or the way the dfa is built change
+CACHE_FORMAT_VERSION = 4
+
+# (TOKEN_NAME, REGEX) or (TOKEN_NAME, REGEX, SKIP)
+SpecEntry = tuple[str, str] | tuple[str, str, str]
+
 class Lexer:
-    # function that merges 2 nfas into one
-    def merge_nfas(self, nfa1: NFA, nfa2: NFA) -> None:
-        # merge the alphabet of the 2 nfas
-        nfa1.S = nfa1.S.union(nfa2.S)
-        # merge the set of states of the 2 nfas
-        nfa1.K = nfa1.K.union(nfa2.K)
-        # merge the transition functions of the 2 nfas
-        nfa1.d.update(nfa2.d)
-        # merge the final states of the 2 nfas
-        nfa1.F = nfa1.F.union(nfa2.F)
-        # add to the transition function the epsilon transition 
-        # from the initial state in nf1 to the initial state in nfa2
-        nfa1.d[(0, EPSILON)].add(nfa2.q0)
-
-
-
-    def __init__(self, spec: list[tuple[str, str]]) -> None:
+    def __init__(self,
+                 spec: list[SpecEntry],
+                 minimize: bool = True,
+                 cache_dir: str | None = None,
+                 lazy: bool = False,
+                 cache_size: int = LAZY_CACHE_SIZE) -> None:
         # initialisation should convert the specification to a dfa which will be used in the lex method
-        # the specification is a list of pairs (TOKEN_NAME:REGEX)
+        # the specification is a list of pairs (TOKEN_NAME:REGEX), a token written as (TOKEN_NAME, REGEX, SKIP)
+        # is matched like the others but it is never returned
+        # if a cache directory is given, the compiled dfa is loaded from it when it was built before
+        # for the same spec, otherwise it is built and saved there
+        # if lazy is true, the dfa is built from the nfa only for the characters the lexer meets,
+        # keeping at most cache_size states (see LazyDFA)
+
+        # the tokens are small ints, their index in the spec, so the one with the lowest
+        # number is the first maximal match, token_names turns them back into names
+        self.token_names = [sys.intern(entry[0]) for entry in spec]
+        self.token_kinds = {token: kind for kind, token in enumerate(self.token_names)}
+        # skipped[kind] tells if the token is never returned
+        self.skipped = [entry[2:] == (SKIP,) for entry in spec]
+
+        if lazy:
+            self.dfa = None
+            self.compiled = None
+            self.nr_states_before = self.nr_states_after = None
+            self.engine = LazyDFA(self.build_nfa(spec), lambda state: state[0], cache_size)
+            self.lookahead = None
+            self.skip_chars, self.skip_run = frozenset(), None
+            return
+
+        if cache_dir is None:
+            self.build(spec, minimize)
+            return
 
-        # for remapping states so they don't have the same name
-        offset_of_states = 0
+        key = self.cache_key(spec, minimize)
+        path = os.path.join(cache_dir, f'lexer-{key}.bin')
+        if not self.load_cache(path, key):
+            self.build(spec, minimize)
+            self.save_cache(path, key)
 
-        # create a new nfa by merging all the nfas of the regex from the specification
-        # the new nfa will have the initial state 0
-        new_nfa = NFA(set(), set(), 0, dict(), set())
-        new_nfa.d[(0, EPSILON)] = set()
+    # build the nfa of the lexer from the specification, the nfas of all the tokens
+    # are reachable on EPSILON from the initial state
+    def build_nfa(self, spec: list[SpecEntry]) -> NFA:
+        # all the regexes are built in the same builder, so the states never have the same name
+        builder = NFABuilder()
+        initial_state = builder.new_state()
+        final_states = set()
 
-        # turn each regex from spec into an nfa
-        for token, regex in spec:
+        for kind, (_, regex, *_) in enumerate(spec):
             # create nfa from regex
-            nfa = parse_regex(regex).thompson()
-            
-            # remap states to avoid name conflicts
-            nfa = nfa.remap_states(lambda x: x + offset_of_states + 1)
+            start, end = parse_regex(regex).build(builder)
 
-            # remap only the final states so that the name of the token is also included
+            # the final state has the number of the token in it,
             # this way we know which token was accepted
-            nfa = nfa.remap_states(lambda x: (token, x) if x in nfa.F else x)
-            
-            # merge nfa into the new nfa
-            self.merge_nfas(new_nfa, nfa)
+            final_state = builder.new_state(kind)
+            builder.add_transition(end, EPSILON, final_state)
+            builder.add_transition(initial_state, EPSILON, start)
+            final_states.add(final_state)
+
+        return builder.nfa(initial_state, final_states)
+
+    # build the dfa of the lexer from the specification
+    def build(self, spec: list[SpecEntry], minimize: bool) -> None:
+        # convert the nfa to dfa
+        self.dfa = self.build_nfa(spec).subset_construction()
+        self.nr_states_before = len(self.dfa.K)
+
+        # merge the equivalent states of the dfa, final states are told apart
+        # by the token they accept, so tokens never get merged together
+        if minimize:
+            self.dfa = self.dfa.minimize(self.accepted_token)
+        self.nr_states_after = len(self.dfa.K)
+
+        # the states are numbered and the characters grouped into classes,
+        # so every step of the lexer is a lookup in a flat table
+        # the token accepted in every final state is found once, here
+        self.compiled = self.dfa.compile(self.accepted_token)
+        self.engine = self.compiled
+        self.lookahead = self.compiled.lookahead()
+        self.skip_chars, self.skip_run = self.skip_scanner()
+
+    # the characters that only start skipped tokens and a regex that matches a run of them
+    # at the start of a token, a run of these characters is skipped without running the dfa:
+    # from the initial state, they only lead to final states of skipped tokens, and from those
+    # states every other character stops the dfa, so the run is all skipped tokens however it is split
+    # (frozenset(), None) if there are no such characters
+    def skip_scanner(self) -> tuple[frozenset[str], Callable[[str, int], re.Match | None] | None]:
+        compiled = self.compiled
+        n_classes = compiled.n_classes
+        table = compiled.table
+
+        def skipping(state: int) -> bool:
+            return state >= 0 and compiled.accept[state] and self.skipped[compiled.tokens[state]]
 
-            offset_of_states += len(nfa.K)
+        classes = {cls for cls in range(n_classes) if skipping(table[compiled.q0 * n_classes + cls])}
+        states = {table[compiled.q0 * n_classes + cls] for cls in classes}
+        todo = list(states)
+        while todo:
+            row = todo.pop() * n_classes
+            for cls in range(n_classes):
+                state = table[row + cls]
+                if state < 0 or compiled.sink[state]:
+                    continue
+                if cls not in classes or not skipping(state):
+                    return frozenset(), None
+                if state not in states:
+                    states.add(state)
+                    todo.append(state)
 
-        # convert new nfa to dfa
-        self.dfa = new_nfa.subset_construction()
+        chars = frozenset(character for character, cls in compiled.class_of.items() if cls in classes)
+        if not chars:
+            return frozenset(), None
+        return chars, re.compile('[' + ''.join(map(re.escape, sorted(chars))) + ']+').match
 
-        # put the token names in order in a list for finding the first maximal match later
-        self.token_order = [token for token, _ in spec]
+    # the key of a spec in the cache, it also depends on the format of the cache
+    def cache_key(self, spec: list[SpecEntry], minimize: bool) -> str:
+        return hashlib.sha256(repr((CACHE_FORMAT_VERSION, minimize, spec)).encode()).hexdigest()
+
+    # load the compiled dfa saved for the key, returns false if it is missing or stale
+    def load_cache(self, path: str, key: str) -> bool:
+        try:
+            with open(path, 'rb') as file:
+                version, saved_key, token_names, nr_states, compiled = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+
+        if version != CACHE_FORMAT_VERSION or saved_key != key or token_names != self.token_names:
+            return False
+
+        # only the compiled form of the dfa is saved
+        self.dfa = None
+        self.nr_states_before, self.nr_states_after = nr_states
+        self.compiled = CompiledDFA.load(compiled)
+        self.engine = self.compiled
+        self.lookahead = self.compiled.lookahead()
+        self.skip_chars, self.skip_run = self.skip_scanner()
+        return True
+
+    # save the compiled dfa for the key, the file is replaced at once
+    # so other processes never read half of it
+    def save_cache(self, path: str, key: str) -> None:
+        data = (CACHE_FORMAT_VERSION, key, self.token_names,
+                (self.nr_states_before, self.nr_states_after), self.compiled.dump())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as file:
+                marshal.dump(data, file)
+            os.replace(tmp_path, path)
+        except OSError:
+            # the cache is only an optimization, the lexer works without it
+            pass
+
+    # get the token accepted in a final state of the dfa
+    # if more tokens are accepted, the one that appears first in the spec wins
+    def accepted_token(self, state: frozenset) -> int:
+        # the final states of the nfas are the tuples (token, number) in the frozenset,
+        # get the token with the lowest index in spec
+        return min(nfa_state[0] for nfa_state in state if isinstance(nfa_state, tuple))
 
     # function for error 1
     # when we have an invalid character and lexer can't accept more characters
     def error1(self, index: int, line: int) -> list[tuple[str, str]]:
         return [("", "No viable alternative at character " + str(index) + ", line " + str(line))]
     
-    # determine the line and column of the error
-    def create_error1(self, word_list: list[str], word: str, i: int) -> list[tuple[str, str]]:
-        char_count = len(word)
-        lines_in_total = word.count('\n')
-        lines_left = word_list[i:].count('\n')
-        pos_last_newline = self.find_nth(word, '\n', lines_in_total - lines_left) if lines_in_total != lines_left else -1
-        char_count_left = len(word_list[i:])
-        index = char_count - char_count_left - pos_last_newline - 1 if pos_last_newline != -1 else char_count - char_count_left
-        return self.error1(index, lines_in_total - lines_left)
+    # determine the line and column of the error at position 'index' in the word
+    # (line, column) is the position of word[start], the lexer already counted the lines up to there,
+    # so only the characters from 'start' to the error are counted
+    def create_error1(self, word: str, index: int, start: int = 0, line: int = 0, column: int = 0) -> list[tuple[str, str]]:
+        newlines = word.count('\n', start, index)
+        if newlines:
+            column = index - word.rfind('\n', start, index) - 1
+        else:
+            column += index - start
+        return self.error1(column, line + newlines)
 
     # function for error 2
     # when we get to the end of the word but the lexer can still accept more characters
     def error_eof(self, line: int) -> None:
         return [("", "No viable alternative at character EOF, line " + str(line))]
 
-    # function that finds a certain occurence of newline in a string
-    def find_nth(self, string: str, char: str, n: int) -> int:
-        start = string.find(char)
-        n -= 1
-        while start >= 0 and n > 0:
-            start = string.find(char, start + len(char))
-            n -= 1
-        return start
-        
-    def lex(self, word: str) -> list[tuple[str, str]] | None:
+    def iter_tokens(self,
+                    source: str | TextIO,
+                    chunk_size: int = CHUNK_SIZE,
+                    start: int = 0,
+                    positions: TokenList | None = None,
+                    line: int | None = None,
+                    column: int = 0) -> Iterator[tuple[str, str]]:
+        # generate the tokens of a string or of a text file, in the form (TOKEN_NAME:MATCHED_STRING)
+        # a token is yielded as soon as its longest match is decided
+        # a file is read in chunks and only the text from the start of the current token is kept
+        # a string can be lexed starting from the position 'start', (line, column) is the position
+        # of 'start', it is counted if it is not given
+        # if positions is given, the offset, line and column of every token are added to it
+        # if the lexer fails, the error is yielded as the last token, with an empty name
+        # the skipped tokens are matched but not yielded, and have no position
+        engine = self.engine
+        token_names = self.token_names
+        skipped = self.skipped
+        skip_chars = self.skip_chars
+        skip_run = self.skip_run
+
+        if isinstance(source, str):
+            word = source
+            read = None
+            if line is None:
+                line = word.count('\n', 0, start)
+                column = start - word.rfind('\n', 0, start) - 1
+        else:
+            read = source.read
+            word = read(chunk_size)
+            start = 0
+            line = 0
+            column = 0
+        more = read is not None and word != ''
+
+        # the line and column are tracked with offsets in the whole source: base is the offset of word[0]
+        # (the text before the current token of a file is dropped), line is the line of word[counted]
+        # and line_start is the offset where that line starts
+        # every character is counted once, up to the next token when its position is kept,
+        # up to the dropped text when a chunk is read, and up to the error
+        base = 0
+        counted = start
+        line_start = start - column
+        if positions is not None:
+            add_offset = positions.offsets.append
+            add_line = positions.lines.append
+            add_col = positions.cols.append
+
+        while True:
+            end = len(word)
+            if start < end and word[start] in skip_chars:
+                # most runs are a single space, the regex is only run for the longer ones
+                start += 1
+                if start < end and word[start] in skip_chars:
+                    start = skip_run(word, start).end()
+            if start == end and not more:
+                return
+
+            if start < end:
+                last_end, last_state, stop, state = engine.longest_match(word, start, end)
+
+            # the word ended before the longest match was decided, read the next chunk
+            if more and (start == end or stop == end):
+                newlines = word.count('\n', counted, start)
+                if newlines:
+                    line += newlines
+                    line_start = base + word.rfind('\n', counted, start) + 1
+                base += start
+                counted = 0
+
+                # the token is matched again from its start, so at least as much as is carried over
+                # is read: the word doubles while a token is longer than a chunk, and a long token
+                # is scanned about twice in total instead of once for every chunk
+                chunk = read(max(chunk_size, end - start))
+                more = chunk != ''
+                word = word[start:] + chunk
+                start = 0
+                continue
+
+            # the character is not in the spec
+            if state < 0:
+                yield self.create_error1(word, stop, counted, line, base + counted - line_start)[0]
+                return
+
+            # if we get to the end of the word and we are not in a final state
+            # we return an error
+            if stop == end and last_end != end:
+                yield self.error_eof(line + word.count('\n', counted))[0]
+                return
+
+            # if we had not been in a final state before, we return an error
+            # because no token was accepted
+            if last_end < 0:
+                yield self.create_error1(word, stop, counted, line, base + counted - line_start)[0]
+                return
+
+            kind = engine.token(last_state)
+            if skipped[kind]:
+                start = last_end
+                continue
+
+            if positions is not None:
+                newlines = word.count('\n', counted, start)
+                if newlines:
+                    line += newlines
+                    line_start = base + word.rfind('\n', counted, start) + 1
+                counted = start
+                add_offset(base + start)
+                add_line(line)
+                add_col(base + start - line_start)
+
+            # the matched string is sliced only once
+            yield (token_names[kind], word[start:last_end])
+            start = last_end
+
+    def record(self, stats: Stats) -> None:
+        # the size of the dfa, for the lazy dfa only the states and transitions it has cached so far
+        if self.compiled is not None:
+            stats.count('dfa states', len(self.compiled.accept))
+            stats.count('transitions', self.compiled.nr_transitions())
+        else:
+            stats.count('dfa states', len(self.engine.cache))
+            stats.count('transitions', sum(map(len, self.engine.cache.values())))
+
+    def lex(self, word: str, stats: Stats | None = None) -> list[tuple[str, str]] | None:
         # this method splits the lexer into tokens based on the specification and the rules described in the lecture
         # the result is a list of tokens in the form (TOKEN_NAME:MATCHED_STRING)
-        
-        # make the word a list of characters
-        word_list = list(word)
-
-        # initialize the next state with the initial state
-        next_state = self.dfa.q0
-
-        # the last time a token was accepted
-        last_time_it_accepted = 0
-
-        i = 0
-        token_list = []
-        possible_pair = ()
-        was_in_final_state = False
-        # number of total \n in the word
-        lines_in_total = word.count('\n')
-
-        while i < len(word_list):
-            # get next state on the current character
-            next_state = self.dfa.d.get((next_state, word_list[i]), None)
-
-            # if the next state is None, it means the character is not in the spec
-            if next_state is None:
-                print('sth')
-                print(word_list[i])
-                return self.create_error1(word_list, word, i)
-            
-            # if the next state is final, we save the token name and the matched string
-            # but we continue to check if there is a longer match
-            if next_state in self.dfa.F:
-                was_in_final_state = True
-
-                # filter only the tuples in the frozenset so we get the
-                # final states of the nfas
-                tokens = list(filter(lambda x: isinstance(x, tuple), next_state))
-                
-                # get the token with the lowest index in spec
-                min_token = min(tokens, key=lambda x: self.token_order.index(x[0]))
-
-                # save the last time a token was accepted
-                last_time_it_accepted = i
-                i += 1
-                # we got into a final state, so we save the token name and the matched string
-                possible_pair = (min_token[0], ''.join(word_list[:i]))
-
-                # if we get to the end of the word and we are in a final state
-                # we add the tuple to the list
-                if i == len(word_list):
-                    token_list.append(possible_pair)
-                    break
-            
-            # if the next state is the sink state
-            elif next_state == frozenset():
-                # if we had not been in a final state before, we return an error
-                # because no token was accepted
-                if not was_in_final_state:
-                    #print(word_list[i])
-                    return self.create_error1(word_list, word, i)
-                
-                # reset the flag
-                was_in_final_state = False
-
-                # reset the next state to the initial state
-                next_state = self.dfa.q0
-
-                # reset the word list to the index of the last time a token was accepted
-                word_list = word_list[last_time_it_accepted + 1:]
-
-                i = 0
-
-                # if we had been in a final state, we add the token accepted to the list
-                if possible_pair:
-                    token_list.append(possible_pair)
-                    possible_pair = ()
-            # if the next state is not final or the sink state, we continue
-            else:
-                i += 1
-                # if we get to the end of the world and we are not in a final state
-                # we return an error
-                if i == len(word_list):
-                    return self.error_eof(lines_in_total)
-        
+        # a single cursor moves over the word, each token is the longest match from the cursor,
+        # so the scan only goes back to the end of the last accepted token
+        # the tokens are returned in a TokenList, with the position of every token
+        token_list = TokenList()
+        token_list.extend(self.iter_tokens(word, positions=token_list))
+        if stats is not None:
+            stats.count('tokens', len(token_list))
+
+        # if there was an error, it is the only thing returned
+        if token_list and token_list[-1][0] == '':
+            return token_list[-1:]
         return token_list
+
+    def tokenize(self, word: str, stats: Stats | None = None, padding: str = '') -> TokenStore:
+        # the tokens of the word in a TokenStore: only the kind, start and end of every token are kept,
+        # no string is sliced and no tuple is made for a token
+        # the tokens are the same as the ones of lex, an error is put in the error of the store
+        # for a spec whose regexes match the spaces around a token, padding can be given (like PADDING):
+        # start and end are then the ones of the core of the match, without the padding characters around it
+        store = TokenStore(word, self.token_names)
+        add_kind = store.kinds.append
+        add_start = store.starts.append
+        add_end = store.ends.append
+        engine = self.engine
+        longest_match = engine.longest_match
+        token = engine.token
+        skipped = self.skipped
+        skip_chars = self.skip_chars
+        skip_run = self.skip_run
+        start = 0
+        end = len(word)
+        error = None
+        # like in iter_tokens, line is the line of word[counted] and line_start the offset where it starts
+        # the tokens are matched in blocks of about CHUNK_SIZE characters and the lines are counted between
+        # two blocks, so there is no counting for every token and an error only counts the rest of its block
+        counted = 0
+        line = 0
+        line_start = 0
+        while start < end and error is None:
+            newlines = word.count('\n', counted, start)
+            if newlines:
+                line += newlines
+                line_start = word.rfind('\n', counted, start) + 1
+            counted = start
+            block_end = min(start + CHUNK_SIZE, end)
+            while start < block_end:
+                if word[start] in skip_chars:
+                    # most runs are a single space, the regex is only run for the longer ones
+                    start += 1
+                    if start < end and word[start] in skip_chars:
+                        start = skip_run(word, start).end()
+                    if start == end:
+                        break
+                last_end, last_state, stop, state = longest_match(word, start, end)
+                # the same errors, in the same order, as in iter_tokens
+                if state < 0:
+                    error = self.create_error1(word, stop, counted, line, counted - line_start)
+                elif stop == end and last_end != end:
+                    error = self.error_eof(line + word.count('\n', counted))
+                elif last_end < 0:
+                    error = self.create_error1(word, stop, counted, line, counted - line_start)
+                else:
+                    kind = token(last_state)
+                    if skipped[kind]:
+                        start = last_end
+                        continue
+                    add_kind(kind)
+                    core_end = last_end
+                    if padding:
+                        while start < core_end and word[start] in padding:
+                            start += 1
+                        while core_end > start and word[core_end - 1] in padding:
+                            core_end -= 1
+                    add_start(start)
+                    add_end(core_end)
+                    start = last_end
+                    continue
+                break
+
+        if error is not None:
+            store.error = error[0][1]
+            store.kinds = array(store.kinds.typecode)
+            store.starts = array('q')
+            store.ends = array('q')
+
+        if stats is not None:
+            stats.count('tokens', len(store))
+        return store
+
+    def relex(self,
+              tokens: list[tuple[str, str]],
+              word: str,
+              offset: int,
+              deleted: int,
+              inserted: str) -> tuple[list[tuple[str, str]], tuple[int, int, int]]:
+        # lex the word again after an edit, reusing the tokens of the word before the edit
+        # the edit replaced 'deleted' characters at 'offset' with 'inserted', 'word' is the new word
+        # returns the new tokens and the range that changed, (first, old_stop, new_stop):
+        # tokens[first:old_stop] were replaced by new_tokens[first:new_stop]
+        # if the tokens are a TokenList (like the ones lex returns), the new tokens are one too
+        # if the lexer fails, the error is returned like in lex, as the whole range
+        # the skipped tokens leave gaps between the tokens, so without the positions of a TokenList
+        # the word is lexed again from the start when the spec has skipped tokens
+        with_positions = isinstance(tokens, TokenList)
+        if not with_positions and any(self.skipped):
+            new_tokens = list(self.iter_tokens(word))
+            if new_tokens and new_tokens[-1][0] == '':
+                return new_tokens[-1:], (0, len(tokens), 1)
+            return new_tokens, (0, len(tokens), len(new_tokens))
+
+        # where every old token starts
+        if with_positions:
+            starts = tokens.offsets
+        else:
+            starts = list(accumulate(map(len, map(itemgetter(1), tokens)), initial=0))[:-1]
+
+        # the tokens that looked at most up to the edit keep their longest match, the lexer starts
+        # again from the last of them (from the start, if the lookahead of the dfa has no limit)
+        lookahead = self.lookahead
+        # the text skipped before the first token can have changed too, so instead of the first token it starts at 0
+        first = max(bisect_right(starts, offset - lookahead) - 1, 0) if lookahead is not None else 0
+        start = starts[first] if first > 0 else 0
+
+        # after the edit, the new word is the old word moved by 'shift'
+        shift = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+
+        positions = None
+        line = None
+        column = 0
+        if with_positions:
+            positions = TokenList()
+            if first > 0:
+                line, column = tokens.lines[first], tokens.cols[first]
+
+        new_tokens = positions if with_positions else []
+        old_stop = len(tokens)
+        for token in self.iter_tokens(word, start=start, positions=positions, line=line, column=column):
+            if token[0] == '':
+                return [token], (0, len(tokens), 1)
+            if with_positions:
+                start = positions.offsets[-1]
+
+            # once a new token starts where an old token started, after the edit,
+            # it and the rest of the tokens are the same as before
+            if start >= edit_end:
+                i = bisect_left(starts, start - shift)
+                if i < len(starts) and starts[i] == start - shift:
+                    old_stop = i
+                    break
+            new_tokens.append(token)
+            start += len(token[1])
+
+        changed = (first, old_stop, first + len(new_tokens))
+        if not with_positions:
+            return tokens[:first] + new_tokens + tokens[old_stop:], changed
+
+        result = TokenList(tokens[:first] + new_tokens + tokens[old_stop:])
+        if old_stop < len(tokens):
+            # the position of the first old token that is kept was added for the new token that met it
+            new_line = positions.lines.pop()
+            new_column = positions.cols.pop()
+            positions.offsets.pop()
+        result.offsets = tokens.offsets[:first] + positions.offsets
+        result.lines = tokens.lines[:first] + positions.lines
+        result.cols = tokens.cols[:first] + positions.cols
+        if old_stop < len(tokens):
+            # the old tokens after the edit moved by 'shift' characters and by the lines the edit added,
+            # the ones on the same line as the first of them also moved by some columns
+            old_line = tokens.lines[old_stop]
+            same_line = bisect_right(tokens.lines, old_line, old_stop)
+
+            result.offsets += self.shifted(tokens.offsets[old_stop:], shift)
+            result.lines += self.shifted(tokens.lines[old_stop:], new_line - old_line)
+            result.cols += self.shifted(tokens.cols[old_stop:same_line], new_column - tokens.cols[old_stop])
+            result.cols += tokens.cols[same_line:]
+        return result, changed
+
+    # add 'by' to all the values of an array
+    def shifted(self, values: array, by: int) -> array:
+        if by == 0:
+            return values
+        return array(values.typecode, [value + by for value in values])
@@ -1,7 +1,9 @@
 from .DFA import DFA
+from .CharClass import CharClass, split_alphabet
+from bisect import bisect_right
 
 from dataclasses import dataclass
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 # import deque for the epsilon closure function because it is faster than a list
 from collections import deque
 
@@ -16,26 +18,6 @@ class NFA[STATE]:
     d: dict[tuple[STATE, str], set[STATE]]
     F: set[STATE]
 
-    def eps_helper(self, queue: deque[STATE], eps_closure: set[STATE]) -> None:
-        # if the queue is empty, recursion ends and the eps_closure set is returned
-        if queue == deque([]):
-            return None
-        # pop the first element from the queue
-        current_state = queue.popleft()
-        # get the next states on the EPSILON character from the transition function
-        next_states = self.d.get((current_state, EPSILON), set())
-        # add next states set to the end of the queue
-        for next_state in next_states:
-            # if the next state is not already in the eps_closure set
-            # add it to the queue
-            if next_state not in eps_closure:
-                queue.append(next_state)
-                # add the new state to the eps_closure set
-                eps_closure.add(next_state)
-        # recursively call the helper function with the updated queue 
-        # and eps_closure set
-        self.eps_helper(queue, eps_closure)
-
     def epsilon_closure(self, state: STATE) -> set[STATE]:
         # compute the epsilon closure of a state (you will need this for subset construction)
         # see the EPSILON definition at the top of this file
@@ -43,89 +25,54 @@ class NFA[STATE]:
         # eps closure contains the state itself in the beginning
         eps_closure = {state}
         queue = deque([state])
-        # the helper function will create the eps_closure set recursively
-        # the queue is what tells the helper function when to stop the recursion
-        self.eps_helper(queue, eps_closure)
-    
+        # go through the states reachable on EPSILON with a worklist, so there is no recursion
+        while queue:
+            current_state = queue.popleft()
+            for next_state in self.d.get((current_state, EPSILON), ()):
+                # if the next state is not already in the eps_closure set
+                # add it to the queue
+                if next_state not in eps_closure:
+                    eps_closure.add(next_state)
+                    queue.append(next_state)
+
         return eps_closure
-    
-    # helper function for subset construction
-    def subset_helper(self, 
-                      queue: deque[frozenset[STATE]], 
-                      dfa_K: set[frozenset[STATE]], 
-                      dfa_d: dict[tuple[frozenset[STATE], str], frozenset[STATE]], 
-                      dfa_F: set[frozenset[STATE]]) -> None:
-        # if the queue is empty, then the recursion ends
-        # it means that there are no more states to add to the DFA
-        if queue == deque([]):
-            return None
-
-        # pop the first state from the queue
-        current_state = queue.popleft()
-
-        # if there is at least one final state from the NFA into the new current set of states of the DFA
-        # then the current set of states of the DFA is a final state
-        for states in current_state:
-            if states in self.F:
-                dfa_F.add(current_state)
-                break
-        
-        # for each character in the alphabet of the NFA
-        for character in self.S:
-            next_states = set()
-            aux = set()
-
-            # for each state in the current set of states of the DFA
-            for states in current_state:
-                # get the next set of states for each 'states' on 'character' from the transition function of the NFA
-                next_states = next_states.union(self.d.get((states, character), set()))
-                # save the result in aux
-                aux = next_states
-            
-            # for each state in the next states set, calculate the epsilon closure
-            for states in aux:
-                next_states = next_states.union(self.epsilon_closure(states))
-            
-            # the union of all the set of states is the set of next states for the current state on 'character'
-            all_next_states = frozenset(next_states)
-            
-            # in the case all_next_states == frozenset(), then the transition function of the NFA is not defined
-            # but, because a DFA must have a transition function for each state and character,
-            # the frozenset() will become a sink state
-            dfa_d[(current_state, character)] = all_next_states
-
-            # if the next states set is not already in the set of states of the DFA
-            # then add the new set of states to the queue
-            if all_next_states not in dfa_K:
-                queue.append(all_next_states)
-                # add the the new set of states to the set of states of the DFA
-                dfa_K.add(all_next_states)
-
-        self.subset_helper(queue, dfa_K, dfa_d, dfa_F)
 
     def subset_construction(self) -> DFA[frozenset[STATE]]:
         # convert this nfa to a dfa using the subset construction algorithm
-
-        # initialize all the fields of the DFA
-        # the alphabet of the DFA is the same as the alphabet of the NFA
-        dfa_S = self.S
-        dfa_F = set()
-        dfa_K = set()
-        dfa_d = dict()
-        queue = deque()
+        # the alphabet of the dfa is made of single characters and of ranges of characters
+        # (CharClass), the classes on the transitions of the nfa are split so they don't overlap
+        # inside, a set of nfa states is an int with one bit for each nfa state,
+        # so unions are a single | and the sets can be used as dict keys
+        bitset_nfa = BitsetNFA(self)
+        close = bitset_nfa.close
 
         # the start state of the DFA is the epsilon closure of the start state of the NFA
-        dfa_q0 = frozenset(self.epsilon_closure(self.q0))
-        # add it to the set of states of the DFA
-        dfa_K.add(dfa_q0)
-
-        # add the start state to the queue
-        queue.append(dfa_q0)
-
-        # call the recursive helper function
-        self.subset_helper(queue, dfa_K, dfa_d, dfa_F)
-        
-        return DFA(dfa_S, dfa_K, dfa_q0, dfa_d, dfa_F)
+        dfa_q0 = bitset_nfa.q0
+        dfa_K = {dfa_q0}
+        dfa_d = dict()
+        queue = deque([dfa_q0])
+
+        while queue:
+            current_state = queue.popleft()
+
+            # in the case there is no transition on a character, the empty set
+            # becomes a sink state, because a DFA must have a transition function
+            # for each state and character
+            reached = bitset_nfa.moves_of(current_state)
+            for character in bitset_nfa.symbols:
+                next_state = close(reached.get(character, 0))
+                dfa_d[(current_state, character)] = next_state
+                if next_state not in dfa_K:
+                    dfa_K.add(next_state)
+                    queue.append(next_state)
+
+        # turn the sets of bits back into sets of nfa states
+        as_set = {mask: bitset_nfa.as_set(mask) for mask in dfa_K}
+        return DFA(set(bitset_nfa.symbols),
+                   set(as_set.values()),
+                   as_set[dfa_q0],
+                   {(as_set[state], character): as_set[next_state] for (state, character), next_state in dfa_d.items()},
+                   {as_set[mask] for mask in dfa_K if mask & bitset_nfa.final_mask})
 
     def remap_states[OTHER_STATE](self, f: 'Callable[[STATE], OTHER_STATE]') -> 'NFA[OTHER_STATE]':
         # optional, but may be useful for the second stage of the project. Works similarly to 'remap_states'
@@ -145,3 +92,139 @@ class NFA[STATE]:
         other_d = {(f(state), char): {f(next_state) for next_state in self.d[(state, char)]} for (state, char) in self.d}
         return NFA(self.S, other_K, other_q0, other_d, other_F)
 
+
+class NFABuilder:
+    # builds an nfa in place: every state gets a fresh number from the same counter,
+    # so the parts of a regex never have to be copied to rename their states
+    def __init__(self) -> None:
+        self.nr_states = 0
+        self.S: set[str] = set()
+        self.K: set = set()
+        self.d: dict[tuple, set] = dict()
+
+    def new_state(self, label: object = None) -> object:
+        # a new state, with a label the state is (label, number), like the final states of the lexer
+        state = self.nr_states if label is None else (label, self.nr_states)
+        self.nr_states += 1
+        self.K.add(state)
+        return state
+
+    def add_transition(self, state: object, character: str | CharClass, next_state: object) -> None:
+        if character != EPSILON:
+            self.S.add(character)
+        self.d.setdefault((state, character), set()).add(next_state)
+
+    def nfa(self, q0: object, F: set) -> NFA:
+        return NFA(self.S, self.K, q0, self.d, F)
+
+
+class BitsetNFA[STATE]:
+    # an nfa where every state has a bit, so a set of states is an int
+    # the epsilon closures are computed only once, used by the subset construction
+    # and by the lazy dfa
+    def __init__(self, nfa: NFA[STATE]) -> None:
+        self.nfa = nfa
+        self.states = list(nfa.K | {nfa.q0} | {s for targets in nfa.d.values() for s in targets})
+        self.bit = {state: i for i, state in enumerate(self.states)}
+
+        # the characters and classes of the nfa are split into symbols that don't overlap
+        self.symbols, symbols_of = split_alphabet(nfa.S)
+        # the symbols that are single characters, and the ones that are ranges
+        # sorted by their first character, for finding the symbol of a character
+        self.characters = {symbol for symbol in self.symbols if not isinstance(symbol, CharClass)}
+        self.ranges = sorted(symbol.ranges[0] + (symbol,) for symbol in self.symbols if isinstance(symbol, CharClass))
+        self.range_starts = [low for low, _, _ in self.ranges]
+
+        # the transitions of every nfa state on every symbol, as sets of bits
+        self.moves: list[dict[str | CharClass, int]] = [dict() for _ in self.states]
+        for (state, character), next_states in nfa.d.items():
+            if character == EPSILON:
+                continue
+            mask = 0
+            for next_state in next_states:
+                mask |= 1 << self.bit[next_state]
+            moves = self.moves[self.bit[state]]
+            for symbol in symbols_of[character]:
+                moves[symbol] = moves.get(symbol, 0) | mask
+
+        self.final_mask = 0
+        for state in nfa.F:
+            if state in self.bit:
+                self.final_mask |= 1 << self.bit[state]
+
+        # the epsilon closure of each nfa state, and of each set reached on a character
+        self.closure: dict[int, int] = {}
+        self.closed: dict[int, int] = {0: 0}
+
+        self.q0 = self.closure_of(self.bit[nfa.q0])
+
+    def bits(self, mask: int) -> Iterator[int]:
+        # the bits set in the mask
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def closure_of(self, i: int) -> int:
+        # the epsilon closure of the nfa state with the bit i
+        if i in self.closure:
+            return self.closure[i]
+        mask = 1 << i
+        queue = deque([i])
+        while queue:
+            j = queue.popleft()
+            for next_state in self.nfa.d.get((self.states[j], EPSILON), ()):
+                k = self.bit[next_state]
+                if mask >> k & 1:
+                    continue
+                # the closure of a state that was already computed is added all at once
+                if k in self.closure:
+                    mask |= self.closure[k]
+                else:
+                    mask |= 1 << k
+                    queue.append(k)
+        self.closure[i] = mask
+        return mask
+
+    def close(self, mask: int) -> int:
+        # the epsilon closure of a set of states
+        result = self.closed.get(mask)
+        if result is None:
+            result = 0
+            for i in self.bits(mask):
+                result |= self.closure_of(i)
+            self.closed[mask] = result
+        return result
+
+    def moves_of(self, mask: int) -> dict[str, int]:
+        # the states reached from a set on each character, before the epsilon closure
+        reached: dict[str, int] = {}
+        for i in self.bits(mask):
+            for character, next_mask in self.moves[i].items():
+                reached[character] = reached.get(character, 0) | next_mask
+        return reached
+
+    def step(self, mask: int, character: str) -> int:
+        # the set of states reached from a set on a character
+        # only the closures of single states are memoized, so this can be used
+        # to simulate the nfa without keeping the sets it goes through
+        reached = 0
+        for i in self.bits(mask):
+            reached |= self.moves[i].get(character, 0)
+        result = 0
+        for i in self.bits(reached):
+            result |= self.closure_of(i)
+        return result
+
+    def symbol_of(self, character: str) -> str | CharClass | None:
+        # the symbol a character belongs to, None if it is not in the alphabet
+        if character in self.characters:
+            return character
+        code = ord(character)
+        i = bisect_right(self.range_starts, code) - 1
+        if i >= 0 and code <= self.ranges[i][1]:
+            return self.ranges[i][2]
+        return None
+
+    def as_set(self, mask: int) -> frozenset[STATE]:
+        return frozenset(self.states[i] for i in self.bits(mask))
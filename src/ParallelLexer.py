@@ -0,0 +1,207 @@
+from src.Lexer import Lexer
+from src.DFA import CompiledDFA
+from src.TokenList import TokenList
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from array import array
+from bisect import bisect_left
+import os
+import pickle
+
+# a word is split only into pieces of at least this many characters
+PARALLEL_MIN_CHUNK = 1 << 20
+
+# how many characters after its piece a worker gets, to finish the token that crosses the end of the piece
+OVERLAP = 1 << 12
+
+# the compiled dfa of a worker process, it is sent once, when the process starts
+worker_dfa: CompiledDFA | None = None
+
+
+def init_worker(data: tuple) -> None:
+    global worker_dfa
+    worker_dfa = CompiledDFA.load(data)
+
+
+def lex_piece(word: str, offset: int, line: int, column: int, target: int, final: bool) -> tuple[array, array, array, array]:
+    # lex a piece of a word in a worker, 'word' starts at 'offset' in the whole word, on (line, column)
+    # the lexer stops after the first token that ends at or after 'target', at an error, or when the
+    # longest match can't be decided from the piece, if the piece is not the end of the whole word ('final')
+    # returns, for every token, its kind, the offset where it ends in the whole word, and its line and column
+    # the skipped tokens are returned too, the lexer that merges the pieces leaves them out
+    engine = worker_dfa
+    kinds = array('i')
+    ends = array('q')
+    lines = array('q')
+    cols = array('q')
+
+    line_start = -column
+    start = 0
+    end = len(word)
+    while start < target:
+        if start == end:
+            break
+        last_end, last_state, stop, state = engine.longest_match(word, start, end)
+        # an error, or a match that could go on after the piece, is left to the lexer that merges the pieces
+        if state < 0 or last_end < 0 or stop == end and (last_end != end or not final):
+            break
+
+        kinds.append(engine.token(last_state))
+        ends.append(offset + last_end)
+        lines.append(line)
+        cols.append(start - line_start)
+
+        newlines = word.count('\n', start, last_end)
+        if newlines:
+            line += newlines
+            line_start = word.rfind('\n', start, last_end) + 1
+        start = last_end
+    return kinds, ends, lines, cols
+
+
+class ParallelLexer:
+    # lex a large word on more processes, the result is the same as the one of lexer.lex
+    # the word is cut into pieces after a newline and the spaces that follow it, every piece is lexed
+    # by a worker with the compiled dfa of the lexer, from the start of the piece
+    # a cut can fall inside a token (for example in the spaces a token takes after a newline), so the
+    # tokens of a piece are used only from a place where the tokens before it also end, the lexer
+    # goes on with the tokens before it until it gets to such a place (like in Lexer.relex)
+    # the line and column of a place don't depend on the tokens, so the workers find them
+    # the errors are always found by the lexer itself, so they are reported like in lex
+    # the lazy dfa is not sent to the workers, a lazy lexer always lexes on one process
+    def __init__(self, lexer: Lexer, workers: int | None = None, min_chunk: int = PARALLEL_MIN_CHUNK) -> None:
+        self.lexer = lexer
+        self.workers = workers or os.cpu_count() or 1
+        self.min_chunk = min_chunk
+        self.pool = None
+
+    def __enter__(self) -> 'ParallelLexer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def start_pool(self) -> ProcessPoolExecutor:
+        # the workers are started the first time they are needed, the dfa is sent to each of them once
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                            initargs=(self.lexer.compiled.dump(),))
+        return self.pool
+
+    def cuts(self, word: str, pieces: int) -> list[tuple[int, int, int]]:
+        # the places where the pieces start, after a newline and the spaces after it,
+        # as (offset, line, column)
+        cuts = [(0, 0, 0)]
+        size = len(word) // pieces
+        for i in range(1, pieces):
+            previous, line, _ = cuts[-1]
+            newline = word.find('\n', max(i * size, previous))
+            if newline < 0:
+                break
+            cut = newline + 1
+            while cut < len(word) and word[cut] == ' ':
+                cut += 1
+            if cut < len(word):
+                cuts.append((cut, line + word.count('\n', previous, cut), cut - newline - 1))
+        return cuts
+
+    def lex(self, word: str) -> list[tuple[str, str]]:
+        pieces = min(self.workers, len(word) // self.min_chunk)
+        if self.lexer.compiled is None or pieces < 2:
+            return self.lexer.lex(word)
+
+        cuts = self.cuts(word, pieces)
+        limits = [cut for cut, _, _ in cuts[1:]] + [len(word)]
+        try:
+            pool = self.start_pool()
+            futures = [pool.submit(lex_piece, word[cut:limit + OVERLAP], cut, line, column,
+                                   limit - cut, limit + OVERLAP >= len(word))
+                       for (cut, line, column), limit in zip(cuts, limits)]
+            results = [future.result() for future in futures]
+        except (BrokenProcessPool, OSError, pickle.PicklingError):
+            # the workers could not be used, lex on this process
+            self.close()
+            return self.lexer.lex(word)
+
+        return self.merge(word, cuts, results)
+
+    def merge(self, word: str, cuts: list[tuple[int, int, int]], results: list[tuple]) -> list[tuple[str, str]]:
+        # put the tokens of the pieces together, the tokens between the pieces are lexed here
+        tokens = TokenList()
+        token_names = self.lexer.token_names
+        skipped = self.lexer.skipped
+        position = 0
+        line = 0
+        column = 0
+        serial = None
+
+        for (cut, _, _), (kinds, ends, lines, cols) in zip(cuts, results):
+            # the first token of the piece that starts where the tokens so far end
+            first = self.meet(position, cut, ends)
+
+            # lex here until the tokens meet the ones of the piece, or go past them
+            while first is None and ends and position < ends[-1]:
+                if serial is None:
+                    serial = self.lexer.iter_tokens(word, start=position, positions=tokens, line=line, column=column)
+                token = next(serial, None)
+                # only skipped tokens were left in the word
+                if token is None:
+                    return tokens
+                if token[0] == '':
+                    return [token]
+                tokens.append(token)
+                position, line, column = self.after(token[1], tokens.offsets[-1], tokens.lines[-1], tokens.cols[-1])
+                first = self.meet(position, cut, ends)
+
+            if first is None or first == len(ends):
+                continue
+
+            # take the tokens of the piece
+            serial = None
+            starts = array('q', [position])
+            starts.extend(ends[first:-1])
+            if any(skipped):
+                kept = [i for i in range(first, len(kinds)) if not skipped[kinds[i]]]
+                tokens.extend([(token_names[kinds[i]], word[starts[i - first]:ends[i]]) for i in kept])
+                tokens.offsets.extend([starts[i - first] for i in kept])
+                tokens.lines.extend([lines[i] for i in kept])
+                tokens.cols.extend([cols[i] for i in kept])
+            else:
+                tokens.extend([(token_names[kind], word[start:end]) for kind, start, end in zip(kinds[first:], starts, ends[first:])])
+                tokens.offsets.extend(starts)
+                tokens.lines.extend(lines[first:])
+                tokens.cols.extend(cols[first:])
+
+            # the last match of the piece can be a skipped token
+            position, line, column = self.after(word[starts[-1]:ends[-1]], starts[-1], lines[-1], cols[-1])
+
+        # the rest of the word, after the last piece that was used
+        if position < len(word):
+            if serial is None:
+                serial = self.lexer.iter_tokens(word, start=position, positions=tokens, line=line, column=column)
+            for token in serial:
+                if token[0] == '':
+                    return [token]
+                tokens.append(token)
+        return tokens
+
+    def meet(self, position: int, cut: int, ends: array) -> int | None:
+        # the index of the token of a piece that starts at 'position', None if no token of the piece starts there
+        if position == cut:
+            return 0
+        i = bisect_left(ends, position)
+        if i < len(ends) and ends[i] == position:
+            return i + 1
+        return None
+
+    def after(self, text: str, offset: int, line: int, column: int) -> tuple[int, int, int]:
+        # the position after a token that starts at (offset, line, column)
+        newlines = text.count('\n')
+        if newlines:
+            return offset + len(text), line + newlines, len(text) - text.rfind('\n') - 1
+        return offset + len(text), line, column + len(text)
@@ -0,0 +1,76 @@
+from src.Lexer import Lexer
+from src.Interpreter import Interpreter, Parser
+from multiprocessing.connection import Connection
+import multiprocessing
+
+# the workers are started with spawn, a process forked from the threads of the server could deadlock
+CONTEXT = multiprocessing.get_context('spawn')
+
+
+def run_programs(connection: Connection, lexer: Lexer) -> None:
+    # the loop of a worker process: it says it is ready, then gets a source, runs it and sends back
+    # (output, error), until the other end of the pipe is closed
+    connection.send(None)
+    while True:
+        try:
+            source = connection.recv()
+        except EOFError:
+            return
+        try:
+            tokens = lexer.tokenize(source)
+            if tokens.error is not None:
+                raise ValueError(tokens.error)
+            result = Interpreter(Parser(tokens).parse()).run(), None
+        except Exception as error:
+            result = None, f'{type(error).__name__}: {error}'
+        connection.send(result)
+
+
+class ProgramWorker:
+    # a process that runs one program at a time, with its own copy of the lexer
+    # unlike a thread, it can be stopped: a program that runs for too long is killed with its process
+    # and a new process is started in its place, so the worker is free again for the next program
+    # the calls block, they are made from one thread at a time
+    def __init__(self, lexer: Lexer) -> None:
+        self.lexer = lexer
+        self.start()
+
+    def start(self) -> None:
+        self.connection, child = CONTEXT.Pipe()
+        self.process = CONTEXT.Process(target=run_programs, args=(child, self.lexer), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def kill(self) -> None:
+        self.connection.close()
+        self.process.kill()
+        self.process.join()
+
+    def close(self) -> None:
+        # the process ends when it reads the end of the pipe, it is killed if it is still running a program
+        self.connection.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+    def run(self, source: str, timeout: float) -> tuple[str | None, str | None]:
+        # (output, error) of the program, raises TimeoutError if it didn't finish in 'timeout' seconds
+        # the time the process takes to start is not counted
+        try:
+            if not self.ready:
+                self.connection.recv()
+                self.ready = True
+            self.connection.send(source)
+            if self.connection.poll(timeout):
+                return self.connection.recv()
+        except (EOFError, OSError):
+            # the process died (the system killed it, it ran out of memory), a new one is started
+            self.kill()
+            self.start()
+            return None, 'the worker process running the program died'
+
+        self.kill()
+        self.start()
+        raise TimeoutError
@@ -1,7 +1,7 @@
-from .NFA import NFA
+from .NFA import NFA, NFABuilder
+from .CharClass import CharClass, ESCAPED_CLASSES, ANY
 from dataclasses import dataclass
 from collections import deque
-import string
 EPSILON = ''
 
 class Regex:
@@ -9,20 +9,15 @@ class Regex:
         self.regex = deque(regex)
     
     def thompson(self) -> NFA[int]:
-        raise NotImplementedError('the thompson method of the Regex class should never be called')
-
-    # for parsing [a-z], [A-Z], [0-9]
-    # [a-z] is equivalent to a|b|c|...|z
-    # so we apply the union operation on all the characters
-    def parse_syntactic_sugar(self, sugar : str) -> 'Regex':
-        i = 0
-        union = Union(Character(sugar[i]), Character(sugar[i+1]))
-        i += 2
-        while i < len(sugar):
-            # union the characters
-            union = Union(union, Character(sugar[i]))
-            i += 1
-        return union
+        # build the nfa of the regex with the Thompson algorithm
+        builder = NFABuilder()
+        start, end = self.build(builder)
+        return builder.nfa(start, {end})
+
+    def build(self, builder: NFABuilder) -> tuple[int, int]:
+        # add the states and transitions of the regex to the builder
+        # returns the initial state and the final state of the part that was added
+        raise NotImplementedError('the build method of the Regex class should never be called')
 
     def parse_round_brackets(self) -> 'Regex':
         self.regex.popleft() # pop the '('
@@ -31,25 +26,41 @@ class Regex:
         self.regex.popleft() # pop the ')'
         return parsed_regex
 
+    # parse one character of a class, or an escape like \d that stands for a class
+    def parse_class_item(self) -> int | CharClass:
+        character = self.regex.popleft()
+        if character == '\\':
+            character = self.regex.popleft()
+            if character in ESCAPED_CLASSES:
+                return ESCAPED_CLASSES[character]
+        return ord(character)
+
+    # for parsing classes like [a-z], [a-zA-Z0-9_], [^0-9] or [\d.]
+    # the class is a single CharClass, not a union of all its characters
     def parse_square_brackets(self) -> 'Regex':
         self.regex.popleft() # pop the '['
-        # create a set of characters
-        char_start = self.regex.popleft()
-        #self.regex.popleft() # pop the '-'
-        #self.regex.popleft() # pop the end character
-        #self.regex.popleft() # pop the ']'
-        for i in range(3):
-            self.regex.popleft()
-        
-        if char_start.isalpha():
-            if char_start.islower():
-                set_char = string.ascii_lowercase
+        negated = self.regex[0] == '^'
+        if negated:
+            self.regex.popleft() # pop the '^'
+
+        ranges = []
+        while self.regex[0] != ']':
+            low = self.parse_class_item()
+            if isinstance(low, CharClass):
+                ranges.extend(low.ranges)
+            # a range like a-z, a '-' right before the ']' is just a character
+            elif self.regex[0] == '-' and self.regex[1] != ']':
+                self.regex.popleft() # pop the '-'
+                high = self.parse_class_item()
+                if isinstance(high, CharClass):
+                    raise ValueError('a class can not be the end of a range')
+                ranges.append((low, high))
             else:
-                set_char = string.ascii_uppercase
-        elif char_start.isdigit():
-            set_char = "0123456789"
+                ranges.append((low, low))
+        self.regex.popleft() # pop the ']'
 
-        return self.parse_syntactic_sugar(set_char)
+        char_class = CharClass.from_ranges(ranges)
+        return CharacterClass(char_class.negate() if negated else char_class)
 
     def parse_concat_parts(self):
         # if the first character is a '('
@@ -60,7 +71,15 @@ class Regex:
         # if the character is \
         elif self.regex[0] == '\\':
             self.regex.popleft()
-            return Character(self.regex.popleft())
+            character = self.regex.popleft()
+            # \d, \w, \s and their negations are classes
+            if character in ESCAPED_CLASSES:
+                return CharacterClass(ESCAPED_CLASSES[character])
+            return Character(character)
+        # . is any character but the newline
+        elif self.regex[0] == '.':
+            self.regex.popleft()
+            return CharacterClass(ANY)
         else:
             return Character(self.regex.popleft())
             
@@ -112,134 +131,73 @@ class Regex:
         return left_part
 
 def eliminate_spaces(regex: str) -> str:
-    # eliminate spaces from the regex
-    regex = regex.replace('\\ ', '\\s').replace(' ', '').replace('\\s', '\\ ')
-    return regex
+    # eliminate spaces from the regex, the escaped ones (\ ) are kept
+    result = []
+    i = 0
+    while i < len(regex):
+        if regex[i] == '\\':
+            result.append(regex[i:i + 2])
+            i += 2
+        else:
+            if regex[i] != ' ':
+                result.append(regex[i])
+            i += 1
+    return ''.join(result)
 
 @dataclass
 class Epsilon(Regex):
 
-    def thompson(self) -> NFA[int]:
-        return NFA({}, {0}, 0, {}, {0})
+    def build(self, builder: NFABuilder) -> tuple[int, int]:
+        # a single state that is both initial and final
+        state = builder.new_state()
+        return state, state
 
 @dataclass
 class Star(Regex):
     regex: Regex
 
-    def thompson(self) -> NFA[int]:
-        nfa = self.regex.thompson()
-
-        # a new initial state {0} needs to be added
-        # all the states in nfa will be incremented by 1
-        nfa = NFA.remap_states(nfa, lambda x: x + 1)
+    def build(self, builder: NFABuilder) -> tuple[int, int]:
+        # a new initial state and a new final state are added around the nfa of the regex
+        start = builder.new_state()
+        old_initial_state, old_final_state = self.regex.build(builder)
+        end = builder.new_state()
 
-        old_initial_state = nfa.q0
-        old_final_state = nfa.F.pop()
-        
-        # set the new initial state to be {0}
-        nfa.q0 = 0
-
-        # add the new initial state {0}
-        nfa.K.add(nfa.q0)
+        # add epsilon transition from the new initial state to the old initial state of the nfa
+        # add epsilon transition from the new initial state to the new final state
+        builder.add_transition(start, EPSILON, old_initial_state)
+        builder.add_transition(start, EPSILON, end)
 
         # add epsilon transition from the old final state of the nfa to the old initial state of the nfa
-        # add epsilon transition from the old final state of the nfa to a new final state {nr_states_nfa}
-        nr_states_nfa = len(nfa.K)
-        nfa.d[(old_final_state, EPSILON)] = {old_initial_state, nr_states_nfa}
-
-        # the new final state {nr_states_nfa} needs to be added
-        nfa.K.add(nr_states_nfa)
-        nfa.F.add(nr_states_nfa)
+        # add epsilon transition from the old final state of the nfa to the new final state
+        builder.add_transition(old_final_state, EPSILON, old_initial_state)
+        builder.add_transition(old_final_state, EPSILON, end)
 
-        # add epsilon transition from the new initial state {0} to the old initial state of the nfa
-        # add epsilon transition from the new initial state {0} to the new final state
-        nfa.d[(nfa.q0, EPSILON)] = {old_initial_state, nr_states_nfa}
+        return start, end
 
-        return nfa
-    
 
 @dataclass
 class Union(Regex):
     regex1: Regex
     regex2: Regex
 
-    def thompson(self) -> NFA[int]:
-        nfa1 = self.regex1.thompson()
-        nfa2 = self.regex2.thompson()
-
-        old_initial_state_nfa1 = nfa1.q0
-        old_final_state_nfa1 = nfa1.F.pop()
-
-        # if the first nfa was already a reunion of two nfa's, we don't need to add a new initial state and
-        # a new final state
-        # if there an epsilon transition from the old initial state of the first nfa to the old final state of the first nfa
-        isunion = nfa1.d.get((old_initial_state_nfa1, EPSILON), set())
-        if isunion != set() and old_final_state_nfa1 not in isunion:
-            nfa2 = NFA.remap_states(nfa2, lambda x: x + len(nfa1.K))
-
-            old_initial_state_nfa2 = nfa2.q0
-
-            old_final_state_nfa2 = nfa2.F.pop()
-
-            nfa1.F.add(old_final_state_nfa1) # the old final state remains final
-            # we add on top to the transition function of the first nfa an epsilon transition from the old initial state
-            # to the old initial state of the second nfa
-            old_value_d = nfa1.d.get((old_initial_state_nfa1, EPSILON), set())
-            old_value_d.add(old_initial_state_nfa2)
-            nfa1.d[(old_initial_state_nfa1, EPSILON)] = old_value_d
-
-            # add an epsilon transition from old final state of the second nfa to the old final state of
-            # the first nfa
-            nfa1.d[(old_final_state_nfa2, EPSILON)] = {old_final_state_nfa1}
-
-            # merge the alphabet of the two nfa's
-            nfa1.S.update(nfa2.S)
-
-            # merge the set of states of the two nfa's
-            nfa1.K.update(nfa2.K)
-
-            # merge the transition functions of the two nfa's
-            nfa1.d.update(nfa2.d)
-
-            return nfa1
-
-        nfa1.F.add(old_final_state_nfa1)
-        
-        nfa1 = NFA.remap_states(nfa1, lambda x: x + 1)
-        nfa2 = NFA.remap_states(nfa2, lambda x: x + len(nfa1.K) + 1)
-
-        old_initial_state_nfa1 = nfa1.q0
-        old_initial_state_nfa2 = nfa2.q0
-
-        old_final_state_nfa1 = nfa1.F.pop()
-        old_final_state_nfa2 = nfa2.F.pop()
-        
-        # save the new nfa into nfa1
-        # merge the alphabet of the two nfa's
-        nfa1.S.update(nfa2.S)
-
-        # merge the set of states of the two nfa's
-        nfa1.K.update(nfa2.K)
-
-        # merge the transition functions of the two nfa's
-        nfa1.d.update(nfa2.d)
-
-        # add a new initial state {0} and new final state {nr_states_nfa1 + nr_states_nfa2 + 1}
-        nfa1.q0 = 0
-        nfa1.K.add(nfa1.q0)
-        new_final_state = len(nfa1.K)
-        nfa1.K.add(new_final_state)
-        nfa1.F.add(new_final_state)
-
-        # add epsilon transitions from the new initial state {0} to the old initial states 
-        # of the two nfa's
-        nfa1.d[(nfa1.q0, EPSILON)] = {old_initial_state_nfa1, old_initial_state_nfa2}
-
-        # add epsilon transitions from the old final states of the two nfa's to the new final state
-        nfa1.d[(old_final_state_nfa1, EPSILON)] = {new_final_state}
-        nfa1.d[(old_final_state_nfa2, EPSILON)] = {new_final_state}
-
-        return nfa1
+    def build(self, builder: NFABuilder) -> tuple[int, int]:
+        # a chain of unions (like the one for [a-z]) gets a single initial and final state,
+        # with epsilon transitions to and from every alternative
+        alternatives = []
+        regex = self
+        while isinstance(regex, Union):
+            alternatives.append(regex.regex2)
+            regex = regex.regex1
+        alternatives.append(regex)
+
+        start = builder.new_state()
+        end = builder.new_state()
+        for alternative in reversed(alternatives):
+            old_initial_state, old_final_state = alternative.build(builder)
+            builder.add_transition(start, EPSILON, old_initial_state)
+            builder.add_transition(old_final_state, EPSILON, end)
+
+        return start, end
 
     
 @dataclass
@@ -247,42 +205,50 @@ class Concat(Regex):
     regex1: Regex
     regex2: Regex
 
-    def thompson(self) -> NFA[int]:
-        nfa_left = self.regex1.thompson()
-        nfa_right = self.regex2.thompson()
-
-        nr_states_nfa_left = len(nfa_left.K)
-        nfa_right = NFA.remap_states(nfa_right, lambda x: x + nr_states_nfa_left)
-
-        # we merge the transition functions of the two nfa's
-        nfa_left.d.update(nfa_right.d)
-        
-        # we merge the alphabet of the two nfa's
-        nfa_left.S.update(nfa_right.S)
-
-        # we merge the set of states of the two nfa's
-        nfa_left.K.update(nfa_right.K)
-
-        # add a new epsilon transition from the final state 
-        # of the left nfa to the start state of the right nfa
-        # also the final state of the left nfa is no longer final
-        # and the initial state of the right nfa in no longer initial
-        nfa_left.d[(nfa_left.F.pop(), EPSILON)] = {nfa_right.q0}
-
-        # we merge the set of final states of the two nfa's
-        nfa_left.F.update(nfa_right.F)
-        # the initial state after concatenation is the initial state of the left nfa
-        # the final state after concatenation is the final state of the right nfa
-        return nfa_left
+    def build(self, builder: NFABuilder) -> tuple[int, int]:
+        # the parts of a chain of concatenations are linked one after the other
+        parts = []
+        regex = self
+        while isinstance(regex, Concat):
+            parts.append(regex.regex2)
+            regex = regex.regex1
+        parts.append(regex)
+
+        # the initial state after concatenation is the initial state of the first part
+        start, end = parts.pop().build(builder)
+        while parts:
+            # add a new epsilon transition from the final state of the left part
+            # to the initial state of the right part
+            right_start, right_end = parts.pop().build(builder)
+            builder.add_transition(end, EPSILON, right_start)
+            end = right_end
+
+        # the final state after concatenation is the final state of the last part
+        return start, end
         
 
 @dataclass
 class Character(Regex):
     character: str
 
-    def thompson(self) -> NFA[int]:
-        # this function gets a Character object and returns an NFA
-        return NFA({self.character}, {0, 1}, 0, {(0, self.character): {1}}, {1})
+    def build(self, builder: NFABuilder) -> tuple[int, int]:
+        # two states with a transition on the character between them
+        start = builder.new_state()
+        end = builder.new_state()
+        builder.add_transition(start, self.character, end)
+        return start, end
+
+
+@dataclass
+class CharacterClass(Regex):
+    char_class: CharClass
+
+    def build(self, builder: NFABuilder) -> tuple[int, int]:
+        # two states with a single transition on the whole class between them
+        start = builder.new_state()
+        end = builder.new_state()
+        builder.add_transition(start, self.char_class, end)
+        return start, end
 
 
 def parse_regex(regex: str) -> Regex:
@@ -0,0 +1,140 @@
+from argparse import ArgumentParser
+from src.Lexer import Lexer
+from src.ProgramWorker import ProgramWorker
+from src.main import Spec, CACHE_DIR
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import math
+import os
+import sys
+
+# how long a program can run before its request gets an error, in seconds
+DEFAULT_TIMEOUT = 10.0
+
+# the longest request line, a program is sent on one line
+LINE_LIMIT = 1 << 24
+
+
+class Server:
+    # keeps worker processes with the lexer alive and runs the programs it gets on a line protocol:
+    # every request is a json object on one line, {"id": ..., "source": "...", "timeout": seconds (optional)}
+    # every response is {"id": ..., "output": "..."} or {"id": ..., "error": "..."}
+    # the requests of a connection are run at the same time, the responses are written as they finish,
+    # so they can come in another order than the requests
+    # a request waits for an idle worker, its timeout counts only while its program runs
+    # a program that times out gets an error and its worker process is started again (see ProgramWorker)
+    def __init__(self, lexer: Lexer, workers: int | None = None, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.workers = [ProgramWorker(lexer) for _ in range(workers or os.cpu_count() or 1)]
+        # the calls to the workers block, every worker is used from a thread
+        self.threads = ThreadPoolExecutor(len(self.workers))
+        self.idle = asyncio.Queue()
+        for worker in self.workers:
+            self.idle.put_nowait(worker)
+        self.timeout = timeout
+
+    def __enter__(self) -> 'Server':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.threads.shutdown()
+        for worker in self.workers:
+            worker.close()
+
+    async def respond(self, line: bytes) -> dict:
+        request = None
+        try:
+            request = json.loads(line)
+            source = request['source']
+            timeout = request.get('timeout', self.timeout)
+            if not isinstance(source, str):
+                raise TypeError(f'the source is not a string: {source!r}')
+            if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not 0 < timeout < math.inf:
+                raise ValueError(f'the timeout is not a positive number of seconds: {timeout!r}')
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            # the id of a request that was read is sent back, the responses can come in any order
+            return {'id': request.get('id') if isinstance(request, dict) else None, 'error': f'bad request: {error}'}
+
+        loop = asyncio.get_running_loop()
+        response = {'id': request.get('id')}
+        worker = await self.idle.get()
+        # the worker is idle again only when its call ends, even if this request is cancelled before that
+        call = self.threads.submit(worker.run, source, timeout)
+        call.add_done_callback(lambda _: loop.call_soon_threadsafe(self.idle.put_nowait, worker))
+        try:
+            output, error = await asyncio.wrap_future(call)
+        except TimeoutError:
+            output, error = None, f'timed out after {timeout} s'
+        if error is None:
+            response['output'] = output
+        else:
+            response['error'] = error
+        return response
+
+    async def answer_all(self, lines: AsyncIterator[bytes], send: Callable[[bytes], Awaitable[None]]) -> None:
+        # answers the requests of one connection until it is closed
+        async def answer(line: bytes) -> None:
+            response = await self.respond(line)
+            await send(json.dumps(response).encode() + b'\n')
+
+        tasks = set()
+        async for line in lines:
+            if line.strip():
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async def send(data: bytes) -> None:
+            writer.write(data)
+            await writer.drain()
+
+        try:
+            await self.answer_all(reader, send)
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path: str) -> None:
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.serve, path, limit=LINE_LIMIT)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self) -> None:
+        # one connection made of stdin and stdout, it ends when stdin is closed
+        # stdin is read on a thread, so it works for files too, not only for pipes
+        loop = asyncio.get_running_loop()
+
+        async def lines() -> AsyncIterator[bytes]:
+            while line := await loop.run_in_executor(None, sys.stdin.buffer.readline):
+                yield line
+
+        async def send(data: bytes) -> None:
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+
+        await self.answer_all(lines(), send)
+
+
+def main():
+    arguments = ArgumentParser(prog='python3.12 -m src.Server', description='Interpret programs sent on a socket or on stdin.')
+    arguments.add_argument('--socket', help='path of the unix socket, stdin and stdout are used without it')
+    arguments.add_argument('--workers', type=int, default=None, help='number of processes that run the programs')
+    arguments.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds a program can run')
+    options = arguments.parse_args()
+
+    with Server(Lexer(Spec.spec, cache_dir=CACHE_DIR), options.workers, options.timeout) as server:
+        try:
+            asyncio.run(server.serve_unix(options.socket) if options.socket else server.serve_stdio())
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
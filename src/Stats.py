@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from collections.abc import Iterator
+from time import perf_counter
+import cProfile
+import os
+import tracemalloc
+
+
+class Stats:
+    # what a run spent in every stage (dfa build, lex, parse, evaluate): the wall time, the peak memory
+    # and the counters the stages record (tokens, ast nodes, evaluation steps, dfa states)
+    # the lexer, the parser and the interpreter only record their counters when they are given a Stats,
+    # so a run without one pays for a single check per call
+    # the peak memory is only measured while tracemalloc is tracing, it makes the stages many times slower
+    # with a profile directory, every stage is also run under cProfile and dumped to <dir>/<name>.<stage>.prof,
+    # the separators of a path in the name are replaced by _
+    def __init__(self, name: str = 'run', profile_dir: str | None = None) -> None:
+        self.name = name
+        self.profile_dir = profile_dir
+        self.times: dict[str, float] = {}
+        self.peaks: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        profile = cProfile.Profile() if self.profile_dir is not None else None
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        start = perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            self.times[stage] = self.times.get(stage, 0.0) + perf_counter() - start
+            if tracing:
+                self.peaks[stage] = max(self.peaks.get(stage, 0), tracemalloc.get_traced_memory()[1])
+            if profile is not None:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                name = self.name.strip(os.sep).replace(os.sep, '_')
+                profile.dump_stats(os.path.join(self.profile_dir, f'{name}.{stage}.prof'))
+
+    def count(self, counter: str, n: int) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def summary(self) -> str:
+        lines = [f'{self.name}:']
+        for stage, elapsed in self.times.items():
+            line = f'  {stage:<12} {elapsed * 1000:10.3f} ms'
+            if stage in self.peaks:
+                line += f'  peak {self.peaks[stage] / 1024:10.1f} KiB'
+            lines.append(line)
+        for counter, n in self.counters.items():
+            lines.append(f'  {counter:<12} {n:10}')
+        if self.counters.get('tokens') and self.times.get('lex'):
+            lines.append(f'  {"tokens/s":<12} {self.counters["tokens"] / self.times["lex"]:10.0f}')
+        return '\n'.join(lines)
@@ -0,0 +1,18 @@
+from enum import IntEnum
+
+
+class TokenKind(IntEnum):
+    # the kinds of tokens of the language, as small ints the parser compares instead of names
+    # they are in the order of the spec in main, so the kinds the lexer gives (the index of the
+    # token in the spec) are already these and the parser doesn't have to translate them
+    # the skipped tokens of the spec come after them, the parser never sees them
+    LAMBDA = 0
+    OPAR = 1
+    CPAR = 2
+    NR = 3
+    ID = 4
+    PLUS = 5
+    CONCAT = 6
+    NEWLINE = 7
+    SEPARATOR = 8
+    TAB = 9
@@ -0,0 +1,21 @@
+from array import array
+
+
+class TokenList(list):
+    # the tokens of a word, in the form (TOKEN_NAME:MATCHED_STRING), together with where they start
+    # the positions are kept in three arrays of ints, one for each field, instead of a tuple for every token:
+    # offsets[i] is the index of the first character of token i in the word,
+    # lines[i] and cols[i] are its line and column, both counted from 0
+    def __init__(self, tokens: list[tuple[str, str]] = ()) -> None:
+        super().__init__(tokens)
+        self.offsets = array('q')
+        self.lines = array('q')
+        self.cols = array('q')
+
+    def position(self, i: int) -> tuple[int, int, int]:
+        # the (offset, line, col) of token i
+        return self.offsets[i], self.lines[i], self.cols[i]
+
+    def end(self, i: int) -> int:
+        # the index right after the last character of token i
+        return self.offsets[i] + len(self[i][1])
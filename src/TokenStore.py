@@ -0,0 +1,74 @@
+from array import array
+from collections.abc import Iterable
+from itertools import accumulate
+
+# the characters around the core of a match that are not part of its text, for a spec whose
+# regexes match the spaces around their token (the spec in main skips them instead)
+# it is only stripped when it is given to Lexer.tokenize or TokenStore.from_tokens
+PADDING = ' '
+
+
+def kind_typecode(nr_kinds: int) -> str:
+    # the typecode of the smallest array that holds the kinds of a spec with nr_kinds tokens
+    if nr_kinds <= 1 << 8:
+        return 'B'
+    if nr_kinds <= 1 << 16:
+        return 'H'
+    return 'i'
+
+
+class TokenStore:
+    # the tokens of a source kept in three arrays instead of a tuple and a string for every token:
+    # kinds[i] is the kind of token i, its index in names (for the lexer, the index of the token in the spec),
+    # source[starts[i]:ends[i]] is its text (without the padding, if it was given),
+    # which is only sliced when it is asked for
+    # the padding between two tokens is in neither of them
+    # if the lexer failed, error has its message and there are no tokens
+    def __init__(self, source: str, names: list[str]) -> None:
+        self.source = source
+        self.names = names
+        self.kinds = array(kind_typecode(len(names)))
+        self.starts = array('q')
+        self.ends = array('q')
+        self.error: str | None = None
+
+    @staticmethod
+    def from_tokens(tokens: Iterable[tuple[str, str]], names: list[str], padding: str = '') -> 'TokenStore':
+        # the store of (TOKEN_NAME, MATCHED_STRING) tokens, the source is the texts put together
+        # (without the skipped tokens) and every match starts where the last one ended
+        # the error token of Lexer.lex (it has an empty name) gives a store with its message as the error
+        kind_of = {name: kind for kind, name in enumerate(names)}
+        kinds = array(kind_typecode(len(names)))
+        add_kind = kinds.append
+        texts = []
+        add_text = texts.append
+        for name, text in tokens:
+            if not name:
+                store = TokenStore('', names)
+                store.error = text
+                return store
+            add_kind(kind_of[name])
+            add_text(text)
+
+        store = TokenStore(''.join(texts), names)
+        store.kinds = kinds
+        add_start = store.starts.append
+        add_end = store.ends.append
+        start = 0
+        for text, end in zip(texts, accumulate(map(len, texts))):
+            core_start = start + len(text) - len(text.lstrip(padding))
+            add_start(core_start)
+            add_end(max(core_start, end - len(text) + len(text.rstrip(padding))))
+            start = end
+        return store
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def text(self, i: int) -> str:
+        # the text of token i, a new string sliced from the source
+        return self.source[self.starts[i]:self.ends[i]]
+
+    def __getitem__(self, i: int) -> tuple[str, str]:
+        # token i in the form (TOKEN_NAME, MATCHED_STRING), like the ones of Lexer.lex (without the padding, if it was given)
+        return self.names[self.kinds[i]], self.text(i)
@@ -0,0 +1,72 @@
+from array import array
+from collections.abc import Iterable
+from src.TokenKind import TokenKind
+
+# the TokenKind of a token name
+KIND_OF = {kind.name: kind.value for kind in TokenKind}
+# how many tokens are kept before the ones the parser is done with are dropped
+WINDOW = 1024
+
+
+class TokenStream:
+    # tokens pulled lazily from an iterator of (TOKEN_NAME, MATCHED_STRING) tokens (for example the ones
+    # of Lexer.iter_tokens), read by the parser in place of the kinds of a store: stream[i] is the kind of token i
+    # the parser reads the token at its position or the one after it and never goes back to a token before
+    # the last but one it read, so once the window is full the tokens before that one are dropped
+    def __init__(self, tokens: Iterable[tuple[str, str]]) -> None:
+        self.tokens = iter(tokens)
+        self.kinds = array('B')
+        self.texts: list[str] = []
+        # the index in the stream of the first token of the window
+        self.offset = 0
+        self.ended = False
+
+    def fill(self, i: int) -> bool:
+        # pull tokens until token i is in the window, returns false if the tokens ended first
+        kinds = self.kinds
+        texts = self.texts
+        if i - self.offset < len(kinds):
+            return True
+        if self.ended:
+            return False
+        drop = min(i - 1 - self.offset, len(kinds))
+        if len(kinds) >= WINDOW and drop > 0:
+            del kinds[:drop]
+            del texts[:drop]
+            self.offset += drop
+        while i - self.offset >= len(kinds):
+            token = next(self.tokens, None)
+            if token is None:
+                self.ended = True
+                return False
+            name, text = token
+            if not name:
+                # the error token of the lexer
+                raise ValueError(text)
+            kinds.append(KIND_OF[name])
+            texts.append(text)
+        return True
+
+    def __getitem__(self, i: int) -> int:
+        # like the kinds of a store, looking at a token after the last one raises an IndexError
+        # the parser reads most tokens more than once, a token in the window is read without calling fill
+        # a token before the window was dropped, it can't be read again
+        j = i - self.offset
+        if j < 0:
+            raise IndexError('token before the window of the stream')
+        if j < len(self.kinds):
+            return self.kinds[j]
+        if not self.fill(i):
+            raise IndexError('array index out of range')
+        return self.kinds[i - self.offset]
+
+    def has(self, i: int) -> bool:
+        # if there is a token i, it is pulled if it is after the window
+        return i - self.offset < len(self.kinds) or self.fill(i)
+
+    def text(self, i: int) -> str:
+        if i < self.offset:
+            raise IndexError('token before the window of the stream')
+        if not self.fill(i):
+            raise IndexError('array index out of range')
+        return self.texts[i - self.offset]
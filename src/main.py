@@ -1,5 +1,13 @@
-from sys import argv
-from src.Lexer import Lexer
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Iterator
+import glob
+import json
+import os
+import sys
+import tracemalloc
+from src.Lexer import Lexer, SKIP
+from src.Stats import Stats
 from dataclasses import dataclass
 from src.Interpreter import Interpreter, Parser
 
@@ -7,36 +15,149 @@ from src.Interpreter import Interpreter, Parser
 @dataclass
 class Spec:
     spec = [
-        ('LAMBDA', '\\ *lambda\\ *'),
-        ('OPAR', '\\ *\\(\\ *'),
-        ('CPAR', '\\ *\\)\\ *'),
-        ('NR', '\\ *[0-9]+\\ *'),
-        ('ID', '\\ *([a-z]|[A-Z])+\\ *'),
-        ('PLUS', '\\ *\\+\\ *'),
-        ('CONCAT', '\\ *\\+\\+\\ *'),
-        ('NEWLINE', '\\ *\n\\ *'),
-        ('SEPARATOR', '\\ *:\\ *'),
-        ('TAB', '\\ *\t\\ *'),
+        ('LAMBDA', 'lambda'),
+        ('OPAR', '\\('),
+        ('CPAR', '\\)'),
+        ('NR', '[0-9]+'),
+        ('ID', '[a-zA-Z]+'),
+        ('PLUS', '\\+'),
+        ('CONCAT', '\\+\\+'),
+        ('NEWLINE', '\n'),
+        ('SEPARATOR', ':'),
+        ('TAB', '\t'),
+        # the spaces between tokens, they are never given to the parser
+        ('SPACE', '\\ +', SKIP),
     ]
 
+# where the compiled lexer is saved between runs
+CACHE_DIR = os.environ.get('INTERPRETER_CACHE_DIR',
+                           os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'interpreter'))
+
+# the lexer of a worker process, loaded once when the process starts
+worker_lexer: Lexer | None = None
+
+def checked_tokens(lexer: Lexer, file) -> Iterator[tuple[str, str]]:
+    # the tokens of a file, the error of the lexer is raised when the parser reads it
+    for token in lexer.iter_tokens(file):
+        if token[0] == '':
+            raise ValueError(token[1])
+        yield token
+
+def run_file(lexer: Lexer, filename: str, stats: Stats | None = None) -> str:
+    if stats is None:
+        # the file is lexed in chunks and parsed as it is lexed, the parser keeps only a window of the tokens
+        with open(filename, 'r') as file:
+            tokens = checked_tokens(lexer, file)
+            try:
+                result = Parser(tokens).parse()
+            finally:
+                # the parser stops after the first expression or at its own error, the rest of the file
+                # is still lexed: like with --stats, a lexer error anywhere in the file is the one raised
+                for _ in tokens:
+                    pass
+        return Interpreter(result).run()
+
+    # the stages are measured one at a time, so the whole file is lexed before it is parsed
+    with stats.stage('lex'):
+        with open(filename, 'r') as file:
+            tokens = lexer.tokenize(file.read(), stats)
+    if tokens.error is not None:
+        raise ValueError(tokens.error)
+    with stats.stage('parse'):
+        result = Parser(tokens, stats).parse()
+    with stats.stage('evaluate'):
+        return Interpreter(result, stats).run()
+
+def init_worker(trace: bool) -> None:
+    # the main process built the lexer and saved it in the cache, the workers only load it
+    global worker_lexer
+    worker_lexer = Lexer(Spec.spec, cache_dir=CACHE_DIR)
+    if trace:
+        tracemalloc.start()
+
+def run_in_worker(filename: str, stats: Stats | None) -> tuple[str, str | None, str | None, Stats | None]:
+    return run_safely(worker_lexer, filename, stats)
+
+def run_safely(lexer: Lexer, filename: str,
+               stats: Stats | None = None) -> tuple[str, str | None, str | None, Stats | None]:
+    # (filename, output, error, stats), a program that fails doesn't stop the others
+    try:
+        return filename, run_file(lexer, filename, stats), None, stats
+    except Exception as error:
+        return filename, None, f'{type(error).__name__}: {error}', stats
+
+def expand(paths: list[str]) -> list[str]:
+    # the files given as arguments, the files in the directories and the files that match the patterns
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        elif glob.has_magic(path):
+            files.extend(match for match in sorted(glob.glob(path, recursive=True)) if os.path.isfile(match))
+        else:
+            files.append(path)
+    return files
+
+def write(results: Iterator[tuple[str, str | None, str | None, Stats | None]], as_json: bool, show_stats: bool) -> bool:
+    # print the results as they come, returns true if a program failed
+    failed = False
+    for filename, output, error, stats in results:
+        if as_json:
+            print(json.dumps({'path': filename, 'output': output} if error is None else {'path': filename, 'error': error}))
+        elif error is None:
+            print(output)
+        else:
+            print(f'{filename}: {error}', file=sys.stderr)
+        if show_stats:
+            print(stats.summary(), file=sys.stderr)
+        failed = failed or error is not None
+    return failed
+
 def main():
-    if len(argv) != 2:
-        return
-    
-    filename = argv[1]
-
-    with open(filename, 'r') as file:
-        string = file.read()
-    
+    arguments = ArgumentParser(prog='python3.12 -m src.main', description='Interpret programs with one lexer.')
+    arguments.add_argument('paths', nargs='+', help='program files, directories or glob patterns')
+    arguments.add_argument('--jobs', '-j', type=int, default=1, help='number of worker processes')
+    arguments.add_argument('--json', action='store_true', help='write one JSON object for every file')
+    arguments.add_argument('--stats', action='store_true',
+                           help='write the time and the counters of every stage to stderr')
+    arguments.add_argument('--memory', action='store_true',
+                           help='add the peak memory of every stage to --stats (tracemalloc makes the stages slower)')
+    arguments.add_argument('--profile', metavar='DIR', help='dump a cProfile file for every stage in DIR')
+    options = arguments.parse_args()
+
+    files = expand(options.paths)
     spec = Spec.spec
-    lexer = Lexer(spec)
-    token_list = lexer.lex(string)
 
-    parser = Parser(token_list)
-    result = parser.parse()
+    # without --stats and --profile nothing is measured
+    options.stats = options.stats or options.memory
+    measured = options.stats or options.profile is not None
+    if options.memory:
+        tracemalloc.start()
+    if measured:
+        stats = Stats('lexer', options.profile)
+        with stats.stage('init'):
+            lexer = Lexer(spec, cache_dir=CACHE_DIR)
+        lexer.record(stats)
+        if options.stats:
+            print(stats.summary(), file=sys.stderr)
+    else:
+        lexer = Lexer(spec, cache_dir=CACHE_DIR)
+    file_stats = [Stats(filename, options.profile) if measured else None for filename in files]
+
+    # the results are written in the order of the files
+    if options.jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(options.jobs, initializer=init_worker, initargs=(options.memory,)) as pool:
+            chunksize = max(1, len(files) // (options.jobs * 8))
+            results = pool.map(run_in_worker, files, file_stats, chunksize=chunksize)
+            failed = write(results, options.json, options.stats)
+    else:
+        results = (run_safely(lexer, filename, stats) for filename, stats in zip(files, file_stats))
+        failed = write(results, options.json, options.stats)
 
-    interpreter = Interpreter(result)
-    interpreter.evaluate()
+    if failed:
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()